@@ -21,6 +21,8 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 from app.db.session import Base
 from app.models.user import User  # Import all models here
+from app.models.revoked_token import RevokedToken
+from app.models.table_watermark import TableWatermark
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,58 @@
+"""add company search index
+
+Revision ID: a0f9a986f166
+Revises: 2662059b1877
+Create Date: 2026-10-18 09:12:40.512031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0f9a986f166'
+down_revision: Union[str, Sequence[str], None] = '2662059b1877'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT_SQL = (
+    "lower(f_unaccent("
+    "coalesce(symbol, '') || ' ' || coalesce(organ_code, '') || ' ' || "
+    "coalesce(organ_short_name, '') || ' ' || coalesce(organ_name, '')"
+    "))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is only STABLE because its dictionary can be swapped at runtime.
+    # Pinning the dictionary lets us declare an IMMUTABLE wrapper usable in
+    # generated columns and indexes.
+    op.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    op.add_column(
+        'companies',
+        sa.Column('search_document', sa.Text(), sa.Computed(SEARCH_DOCUMENT_SQL, persisted=True)),
+    )
+    op.create_index(
+        'ix_companies_search_document_trgm',
+        'companies',
+        ['search_document'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'search_document': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_companies_search_document_trgm', table_name='companies')
+    op.drop_column('companies', 'search_document')
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,58 @@
+"""add table watermarks
+
+Revision ID: e8b41d0c3f6a
+Revises: c51f3e9d2a7b
+Create Date: 2026-10-18 21:40:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b41d0c3f6a'
+down_revision: Union[str, Sequence[str], None] = 'c51f3e9d2a7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'table_watermarks',
+        sa.Column('table_name', sa.String(length=63), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    # Once per statement rather than per row, so a bulk import bumps it once.
+    # updated_at never moves backwards, even if an older transaction commits last.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_watermark() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_watermarks (table_name, version, updated_at)
+            VALUES (TG_TABLE_NAME, 1, clock_timestamp())
+            ON CONFLICT (table_name) DO UPDATE
+                SET version = table_watermarks.version + 1,
+                    updated_at = greatest(table_watermarks.updated_at, clock_timestamp());
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER companies_watermark "
+        "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON companies "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_watermark()"
+    )
+    op.execute("INSERT INTO table_watermarks (table_name) VALUES ('companies')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS companies_watermark ON companies")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_watermark()")
+    op.drop_table('table_watermarks')
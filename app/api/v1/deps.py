@@ -1,48 +1,237 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, Query, status
+import secrets
+import time
+from typing import Generator, List, Literal, Optional
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.crud import crud_user
-from app.models.user import User
+from app.core.negotiation import negotiate_media_type
+from app.crud import crud_token, crud_user
+from app.models.user import Role, User
 from app.schemas.token import TokenPayload
-from app.schemas import PaginationParams
-from app.db.session import get_db
+from app.schemas import Company as CompanySchema, PaginationParams
+from app.db.replica import READS_OWN_WRITES_STATE_KEY, WRITER_STATE_KEY, replica_router
+from app.db.session import SessionLocal, get_db, get_engine
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    For streaming responses, which outlive request-scoped dependencies and so
+    must open their own session while the body is being sent.
+    """
+    get_engine()
+    return SessionLocal
+
+
+async def get_read_session_factory(request: Request) -> async_sessionmaker:
+    """Like get_session_factory, for streaming responses that only read."""
+    return replica_router.session_factory(
+        request.cookies.get(settings.DB_REPLICA_STICKY_COOKIE), await _bearer_subject(request)
+    )
+
+
+async def _bearer_subject(request: Request) -> Optional[str]:
+    """
+    User id of the request's access token, only looked up while some user
+    has recently written: bearer clients without a cookie jar are kept on the
+    primary by it. Invalid tokens are left for get_current_user to reject.
+    """
+    if not replica_router.writers:
+        return None
+    scheme, token = get_authorization_scheme_param(request.headers.get("authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        token_data = await get_token_payload(token)
+    except HTTPException:
+        return None
+    return str(token_data.sub) if token_data.sub else None
+
+
+def reads_own_writes(request: Request) -> None:
+    """
+    For routes writing data that is served from the replica: after a
+    successful write the client's reads stay on the primary for a while, so it
+    sees its own write (see ReadYourWritesMiddleware). Other writes, such as
+    logging in, leave the client on the replica.
+    """
+    setattr(request.state, READS_OWN_WRITES_STATE_KEY, True)
+
+
+async def get_read_db(request: Request):
+    """
+    Session for endpoints that only read: the replica when one is configured,
+    unless it lags or this client wrote moments ago, else the primary.
+    """
+    async with (await get_read_session_factory(request))() as session:
+        yield session
+
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl="/api/v1/auth/login"
 )
 
+# Decoded access tokens, kept no longer than the token itself is valid
+token_cache: TTLCache[str, TokenPayload] = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+async def get_token_payload(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+    """
+    Decode the bearer access token, served from the token cache when possible.
+    """
+    token_data = token_cache.get(token)
+    if token_data is None or (token_data.exp is not None and token_data.exp <= time.time()):
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            token_data = TokenPayload(**payload)
+        except (jwt.JWTError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        if token_data.type == "refresh":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        if token_data.exp is not None:
+            token_cache.set(token, token_data, ttl=token_data.exp - time.time())
+    return token_data
+
+
 async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    token_data: TokenPayload = Depends(get_token_payload),
 ) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    # Always the primary: a replica behind a logout or password change would
+    # still accept the revoked token. Nearly always answered by the in-memory
+    # revocation filter and the principal cache, so rarely a query at all.
+    if token_data.jti and await crud_token.revoked_token.is_revoked(db, jti=token_data.jti):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
+            detail="Token has been revoked",
         )
-    current_user = await crud_user.user.get(db, id=token_data.sub)
+    current_user = await crud_user.user.get_principal(db, id=token_data.sub)
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
+    if token_data.ver != current_user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token has been revoked",
+        )
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    setattr(request.state, WRITER_STATE_KEY, str(current_user.id))
     return current_user
 
 
+async def require_metrics_access(
+    request: Request,
+    token: str = Depends(reusable_oauth2),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    """
+    Metrics describe the internals of the service: open to the configured
+    scrape token and to admins only.
+    """
+    if settings.METRICS_TOKEN and secrets.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        return
+    current_user = await get_current_user(request, db, await get_token_payload(token))
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough privileges",
+        )
+
+
 def get_pagination_params(
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(
+        None,
+        description="Opaque keyset cursor. Pass an empty value to start cursor pagination, "
+        "then the `next_cursor` of the previous page.",
+    ),
+    order_by: Optional[Literal["id", "symbol"]] = Query(
+        None, description="Sort column. Searches are ranked by relevance when omitted."
+    ),
+    count: Literal["exact", "estimate", "none"] = Query(
+        "exact",
+        description="How `total` is computed: an exact count, a planner estimate, "
+        "or skipped entirely (`total` and `pages` are null).",
+    ),
 ) -> PaginationParams:
     """
     A dependency that returns pagination parameters.
     Can be reused across multiple API endpoints.
     """
     skip = (page - 1) * page_size
-    return PaginationParams(skip=skip, limit=page_size, search=search, page=page) 
\ No newline at end of file
+    return PaginationParams(
+        skip=skip,
+        limit=page_size,
+        search=search,
+        page=page,
+        cursor=cursor,
+        order_by=order_by,
+        count=count,
+    ) 
+
+
+COMPANY_FIELDS = tuple(CompanySchema.model_fields)
+# Default projection for list pages: everything except the unbounded text column
+COMPANY_LIST_FIELDS = tuple(name for name in COMPANY_FIELDS if name != "business_descriptions")
+
+
+def get_company_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of company fields to return"
+    )
+) -> Optional[List[str]]:
+    """
+    A dependency that parses a `fields=` projection. Returns None when all
+    fields were requested.
+    """
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in COMPANY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return requested or None
+
+
+def get_company_list_fields(
+    fields: Optional[List[str]] = Depends(get_company_fields),
+) -> List[str]:
+    """
+    Columns to return on company list pages: the requested projection, or the
+    default list fields (without business_descriptions unless configured).
+    """
+    if fields:
+        return fields
+    if settings.COMPANY_LIST_DEFER_DESCRIPTIONS:
+        return list(COMPANY_LIST_FIELDS)
+    return list(COMPANY_FIELDS)
+
+
+
+def get_response_media_type(request: Request) -> str:
+    """
+    A dependency that picks the representation for list responses from the
+    Accept header: application/json, or application/msgpack if preferred.
+    """
+    return negotiate_media_type(request.headers.get("accept"))
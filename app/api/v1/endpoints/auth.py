@@ -1,18 +1,21 @@
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import math
+from datetime import datetime, timezone
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt
 from pydantic import ValidationError
 
-from app.crud import crud_user
+from app.crud import crud_token, crud_user
 from app.models import user as models_user
 from app.schemas import user as schemas_user
 from app.schemas import token as schemas_token
 from app.api.v1 import deps
 from app.core.config import settings
 from app.core import security
-from app.core.notifications import send_discord_notification
+from app.core.notifications import REGISTRATION_TITLE, notification_dispatcher
+from app.core.throttle import login_throttle
 
 router = APIRouter()
 
@@ -21,7 +24,6 @@ async def register(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_in: schemas_user.UserCreate,
-    background_tasks: BackgroundTasks,
 ) -> Any:
     """
     Create new user.
@@ -35,38 +37,46 @@ async def register(
     user = await crud_user.user.create(db, obj_in=user_in)
     
     # Gửi thông báo đến Discord
-    notification_message = f"🎉 **Thành viên đăng ký thành công !**\n" \
-                          f"**Email:** {user.email}\n" \
+    notification_message = f"**Email:** {user.email}\n" \
                           f"**Phone:** {user.phone}\n" \
                           f"**Tên:** {user.full_name}\n" \
                           f"**Thời gian:** {user.create_date.strftime('%Y-%m-%d %H:%M:%S')}"
     
-    # Sử dụng background task để không làm chậm phản hồi API
-    background_tasks.add_task(send_discord_notification, notification_message)
+    # Chỉ đưa vào hàng đợi, dispatcher gửi gộp theo lô nên không làm chậm phản hồi API
+    notification_dispatcher.notify(notification_message, title=REGISTRATION_TITLE)
     
     return user
 
 @router.post("/login", response_model=schemas_token.Token)
 async def login(
+    request: Request,
     db: AsyncSession = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
+    # Behind a reverse proxy this relies on uvicorn's --proxy-headers
+    client_ip = request.client.host if request.client else "unknown"
+    # Checked before the user lookup so throttled clients cost no DB or bcrypt work
+    retry_after = await login_throttle.check(client_ip, form_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
     user = await crud_user.user.authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
+        await login_throttle.failure(client_ip, form_data.username)
         raise HTTPException(status_code=401, detail="Incorrect email or password")
-    elif not user.is_active:
+    await login_throttle.success(client_ip, form_data.username)
+    if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
-    return {
-        "access_token": security.create_access_token(user.id),
-        "refresh_token": security.create_refresh_token(user.id),
-        "token_type": "bearer",
-    }
+    return _token_pair(user)
 
 @router.post("/refresh-token", response_model=schemas_token.Token)
 async def refresh_token(
@@ -75,26 +85,112 @@ async def refresh_token(
     refresh_token_in: schemas_token.RefreshToken,
 ) -> Any:
     """
-    Refresh access token.
+    Exchange a refresh token for a new token pair.
+
+    Refresh tokens are single use: the presented token is revoked as part of
+    the exchange. Presenting an already used token revokes every session of
+    its user, since it means the token was copied.
     """
-    try:
-        payload = jwt.decode(
-            refresh_token_in.refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = schemas_token.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    token_data = _decode_refresh_token(refresh_token_in.refresh_token)
+    if await crud_token.revoked_token.is_revoked(db, jti=token_data.jti):
+        await crud_user.user.revoke_all_tokens(db, id=token_data.sub)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials, invalid refresh token",
+            detail="Refresh token has been revoked",
         )
     
+    # Not the principal cache: a revoke-all in another worker must apply at once
     user = await crud_user.user.get(db, id=token_data.sub)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if token_data.ver != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Refresh token has been revoked",
+        )
     
+    # Built before the commit below expires `user`
+    tokens = _token_pair(user)
+    # Losing this race means the same token was redeemed concurrently
+    rotated = await crud_token.revoked_token.revoke(
+        db,
+        jti=token_data.jti,
+        user_id=token_data.sub,
+        expires_at=datetime.fromtimestamp(token_data.exp, tz=timezone.utc),
+    )
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Refresh token has been revoked",
+        )
+    return tokens
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    refresh_token_in: Optional[schemas_token.RefreshToken] = None,
+    token_data: schemas_token.TokenPayload = Depends(deps.get_token_payload),
+    current_user: models_user.User = Depends(deps.get_current_user),
+) -> None:
+    """
+    Revoke the current access token and, if given, the refresh token.
+    """
+    user_id = current_user.id
+    if token_data.jti and token_data.exp:
+        await crud_token.revoked_token.revoke(
+            db,
+            jti=token_data.jti,
+            user_id=user_id,
+            expires_at=datetime.fromtimestamp(token_data.exp, tz=timezone.utc),
+        )
+    if refresh_token_in is not None:
+        refresh_data = _decode_refresh_token(refresh_token_in.refresh_token)
+        if refresh_data.sub != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Refresh token belongs to another user",
+            )
+        await crud_token.revoked_token.revoke(
+            db,
+            jti=refresh_data.jti,
+            user_id=user_id,
+            expires_at=datetime.fromtimestamp(refresh_data.exp, tz=timezone.utc),
+        )
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models_user.User = Depends(deps.get_current_user),
+) -> None:
+    """
+    Revoke every access and refresh token of the current user.
+    """
+    await crud_user.user.revoke_all_tokens(db, id=current_user.id)
+
+
+def _token_pair(user: models_user.User) -> dict:
     return {
-        "access_token": security.create_access_token(user.id),
-        "refresh_token": security.create_refresh_token(user.id),
+        "access_token": security.create_access_token(user.id, version=user.token_version),
+        "refresh_token": security.create_refresh_token(user.id, version=user.token_version),
         "token_type": "bearer",
-    } 
\ No newline at end of file
+    }
+
+
+def _decode_refresh_token(token: str) -> schemas_token.TokenPayload:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        token_data = schemas_token.TokenPayload(**payload)
+    except (jwt.JWTError, ValidationError):
+        token_data = None
+    # Tokens issued before rotation existed carry no jti and must log in again
+    if token_data is None or token_data.type != "refresh" or not token_data.jti:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials, invalid refresh token",
+        )
+    return token_data
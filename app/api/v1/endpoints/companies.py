@@ -1,47 +1,377 @@
-from typing import Any, List
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app import crud, schemas
 from app.api.v1 import deps
+from app.core.changefeed import SlowConsumer, company_feed
+from app.core.conditional import is_not_modified, make_etag, not_modified, validator_headers
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import (
+    MSGPACK_MEDIA_TYPE,
+    msgpack_available,
+    render_company,
+    render_company_cursor_page,
+    render_company_page,
+)
+from app.core.streaming import (
+    encode_csv,
+    encode_msgpack,
+    encode_ndjson,
+    iter_csv_records,
+    iter_ndjson_records,
+)
 
 router = APIRouter()
 
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "msgpack": MSGPACK_MEDIA_TYPE,
+}
 
-@router.get("/", response_model=schemas.PaginatedResponse[schemas.Company])
+
+def _row_columns(fields: Optional[List[str]]) -> List[str]:
+    # update_date is always fetched since it is the row's validator
+    columns = list(fields or deps.COMPANY_FIELDS)
+    return columns if "update_date" in columns else columns + ["update_date"]
+
+
+def _company_response(
+    request: Request, key: Any, company: Dict[str, Any], fields: Optional[List[str]]
+) -> Response:
+    """A single company, or 304 if the client's copy is still current."""
+    last_modified = company["update_date"]
+    etag = make_etag(key, last_modified, request.url.query)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return not_modified(headers)
+    if fields and "update_date" not in fields:
+        del company["update_date"]
+    return Response(
+        content=render_company(company), media_type="application/json", headers=headers
+    )
+
+
+@router.get(
+    "/",
+    response_model=Union[
+        schemas.PaginatedResponse[schemas.Company],
+        schemas.CursorPaginatedResponse[schemas.Company],
+    ],
+)
 async def read_companies(
-    db: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db),
     pagination: schemas.PaginationParams = Depends(deps.get_pagination_params),
+    columns: List[str] = Depends(deps.get_company_list_fields),
+    media_type: str = Depends(deps.get_response_media_type),
 ) -> Any:
     """
     Retrieve companies with pagination and search.
+
+    Uses `page`/`page_size` by default. When `cursor` is given, switches to
+    keyset pagination and returns a `next_cursor` instead of page totals.
+    `business_descriptions` is left out unless requested with `fields=`.
+
+    Pages carry an ETag and Last-Modified derived from the companies table's
+    change watermark, so revalidating an unchanged page costs one primary key
+    lookup and returns 304.
+
+    Send `Accept: application/msgpack` to get the same document as
+    MessagePack (when the server has msgpack installed).
     """
+    headers: Dict[str, str] = {"Vary": "Accept"}
+    watermark = await crud.company.get_watermark(db)
+    if watermark is not None:
+        version, last_modified = watermark
+        etag = make_etag(
+            version, columns, sorted(request.query_params.multi_items()), media_type
+        )
+        headers.update(validator_headers(etag, last_modified))
+        if is_not_modified(request.headers, etag, last_modified):
+            return not_modified(headers)
+
+    # Rows are fetched as plain dicts of the selected columns and serialized
+    # directly, bypassing response_model validation (kept for the OpenAPI schema)
+    if pagination.cursor is not None:
+        # Keyset pages need a deterministic sort key, so they are never ranked
+        order_by = pagination.order_by or "id"
+        try:
+            after = decode_cursor(pagination.cursor, order_by=order_by)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+        companies, next_key = await crud.company.get_multi_by_cursor(
+            db,
+            after=after,
+            limit=pagination.limit,
+            search=pagination.search,
+            order_by=order_by,
+            columns=columns,
+        )
+        next_cursor = encode_cursor(order_by, *next_key) if next_key else None
+        return Response(
+            content=render_company_cursor_page(companies, next_cursor, pagination, media_type),
+            media_type=media_type,
+            headers=headers,
+        )
+
     companies, total = await crud.company.get_multi(
-        db, skip=pagination.skip, limit=pagination.limit, search=pagination.search
+        db,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        search=pagination.search,
+        order_by=pagination.order_by,
+        count=pagination.count,
+        columns=columns,
+    )
+    return Response(
+        content=render_company_page(companies, total, pagination, media_type),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_companies(
+    *,
+    session_factory: async_sessionmaker = Depends(deps.get_read_session_factory),
+    format: Optional[Literal["ndjson", "csv", "msgpack"]] = Query(
+        None, description="Defaults to msgpack if preferred by Accept, else ndjson"
+    ),
+    media_type: str = Depends(deps.get_response_media_type),
+    fields: Optional[List[str]] = Depends(deps.get_company_fields),
+    updated_since: Optional[datetime] = Query(
+        None, description="Only export companies updated at or after this time (UTC if naive)"
+    ),
+) -> Any:
+    """
+    Stream every company as NDJSON, CSV or a sequence of MessagePack maps.
+
+    Rows are read through a server-side cursor and written out batch by batch,
+    so memory use does not grow with the size of the table.
+    """
+    if format is None:
+        format = "msgpack" if media_type == MSGPACK_MEDIA_TYPE else "ndjson"
+    elif format == "msgpack" and not msgpack_available():
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="MessagePack is not available on this server",
+        )
+    columns = fields or list(deps.COMPANY_FIELDS)
+    if updated_since is not None and updated_since.tzinfo is not None:
+        # update_date is stored as naive UTC
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    async def body():
+        if format == "csv":
+            yield encode_csv([columns])
+        async with session_factory() as db:
+            async for rows in crud.company.stream_rows(
+                db, columns=columns, updated_since=updated_since
+            ):
+                if format == "csv":
+                    yield encode_csv(rows)
+                elif format == "msgpack":
+                    yield encode_msgpack(dict(zip(columns, row)) for row in rows)
+                else:
+                    yield encode_ndjson(dict(zip(columns, row)) for row in rows)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="companies.{format}"',
+            "Vary": "Accept",
+        },
+    )
+
+
+@router.get("/batch", response_model=schemas.CompanyBatch)
+async def read_companies_batch(
+    *,
+    db: AsyncSession = Depends(deps.get_read_db),
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols, e.g. VCB,FPT"),
+    ids: Optional[str] = Query(None, description="Comma-separated company ids"),
+) -> Any:
+    """
+    Look up many companies by symbol or by id with a single query.
+
+    Results follow the request order; keys without a company are listed in
+    `missing`.
+    """
+    if (symbols is None) == (ids is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of symbols or ids",
+        )
+    raw_keys = [key.strip() for key in (symbols or ids).split(",") if key.strip()]
+    if ids is not None:
+        try:
+            keys: List[Any] = list(dict.fromkeys(int(key) for key in raw_keys))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ids must be integers",
+            )
+    else:
+        keys = list(dict.fromkeys(raw_keys))
+    if len(keys) > settings.COMPANY_BATCH_MAX_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.COMPANY_BATCH_MAX_KEYS} keys per request",
+        )
+
+    if ids is not None:
+        companies = await crud.company.get_multi_by_ids(db, ids=keys)
+        found = {company.id: company for company in companies}
+    else:
+        companies = await crud.company.get_multi_by_symbols(db, symbols=keys)
+        found = {company.symbol: company for company in companies}
+    return schemas.CompanyBatch(
+        items=[found[key] for key in keys if key in found],
+        missing=[key for key in keys if key not in found],
     )
-    return schemas.PaginatedResponse.create(items=companies, total=total, params=pagination)
+
+
+def _check_feed_capacity() -> None:
+    if company_feed.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many change feed subscribers",
+            headers={"Retry-After": "5"},
+        )
+
+
+@router.get("/changes", response_class=StreamingResponse)
+async def stream_company_changes(
+    request: Request,
+    last_event_id: Optional[str] = Query(
+        None, description="Resume after this event id (same as the Last-Event-ID header)"
+    ),
+) -> Any:
+    """
+    Server-Sent Events stream of company `create`, `update` and `delete`
+    events. Each event's `data` is `{"id", "type", "company"}`; deletes only
+    carry the company's id and symbol. Bulk writes (imports) send one `bulk`
+    event per batch instead, `{"id", "type", "created", "updated"}` listing the
+    id and symbol of each company that actually changed.
+
+    Reconnecting with `Last-Event-ID` replays the events missed in between.
+    If they are no longer available a `reset` event is sent first, and the
+    client should refetch the companies it tracks. Clients that fall too far
+    behind are disconnected and can resume the same way.
+    """
+    _check_feed_capacity()
+    resume_from = request.headers.get("last-event-id") or last_event_id
+
+    async def body():
+        subscription = company_feed.subscribe(resume_from)
+        try:
+            if subscription.reset:
+                yield f"id: {company_feed.last_event_id}\nevent: reset\ndata: {{}}\n\n".encode()
+            elif not resume_from:
+                # An id without data gives the client a resume point before any event
+                yield f"id: {company_feed.last_event_id}\n\n".encode()
+            while True:
+                try:
+                    event = await subscription.next(settings.COMPANY_FEED_HEARTBEAT_SECONDS)
+                except SlowConsumer:
+                    return
+                if event is None:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                    event.id.encode(), event.type.encode(), event.data
+                )
+        finally:
+            company_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Stop reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/changes/ws")
+async def company_changes_websocket(
+    websocket: WebSocket, last_event_id: Optional[str] = None
+) -> None:
+    """
+    The same feed as /changes over a WebSocket: one JSON message per event,
+    preceded by `{"type": "subscribed", "id"}` (or `{"type": "reset", "id"}`
+    when the resume point is gone) and `{"type": "keepalive"}` while idle.
+    """
+    if company_feed.full:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    subscription = company_feed.subscribe(last_event_id)
+    try:
+        await websocket.send_json(
+            {
+                "type": "reset" if subscription.reset else "subscribed",
+                "id": company_feed.last_event_id,
+            }
+        )
+        while True:
+            try:
+                event = await subscription.next(settings.COMPANY_FEED_HEARTBEAT_SECONDS)
+            except SlowConsumer:
+                # 1013: try again later, resuming from the last event received
+                await websocket.close(code=1013)
+                return
+            if event is None:
+                await websocket.send_json({"type": "keepalive"})
+            else:
+                await websocket.send_text(event.data.decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        company_feed.unsubscribe(subscription)
 
 
 @router.get("/symbol/{symbol}", response_model=schemas.Company)
 async def read_company_by_symbol(
     *,
-    db: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db),
     symbol: str,
+    fields: Optional[List[str]] = Depends(deps.get_company_fields),
 ) -> Any:
     """
-    Get company by symbol.
+    Get company by symbol. `fields=` limits the response to those fields.
+    Supports conditional requests (ETag / Last-Modified from `update_date`).
     """
-    company = await crud.company.get_by_symbol(db, symbol=symbol)
+    company = await crud.company.get_by_symbol(db, symbol=symbol, columns=_row_columns(fields))
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company not found",
         )
-    return company
+    return _company_response(request, symbol, company, fields)
 
 
-@router.post("/", response_model=schemas.Company)
+@router.post("/", response_model=schemas.Company, dependencies=[Depends(deps.reads_own_writes)])
 async def create_company(
     *,
     db: AsyncSession = Depends(deps.get_db),
@@ -71,25 +401,66 @@ async def create_company(
     return company
 
 
+@router.post(
+    "/import",
+    response_model=schemas.CompanyImportResult,
+    dependencies=[Depends(deps.reads_own_writes)],
+)
+async def import_companies(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    batch_size: int = Query(settings.COMPANY_IMPORT_BATCH_SIZE, ge=1, le=2000),
+    max_errors: int = Query(settings.COMPANY_IMPORT_MAX_ERRORS, ge=0),
+    current_user: schemas.User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Bulk create or update companies (matched by symbol) from a streamed upload.
+
+    Send `application/x-ndjson` (one JSON object per line) or `text/csv` with a
+    header row. Rows are validated as they arrive and written in batches of
+    `batch_size`; invalid rows are skipped and reported. Rows identical to the
+    stored company count as neither inserted nor updated.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        records = iter_ndjson_records(request.stream())
+    elif content_type == "text/csv":
+        records = iter_csv_records(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload must be application/x-ndjson or text/csv",
+        )
+    return await crud.company.import_records(
+        db, records=records, batch_size=batch_size, max_errors=max_errors
+    )
+
+
 @router.get("/{company_id}", response_model=schemas.Company)
 async def read_company(
     *,
-    db: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db),
     company_id: int,
+    fields: Optional[List[str]] = Depends(deps.get_company_fields),
 ) -> Any:
     """
-    Get company by ID.
+    Get company by ID. `fields=` limits the response to those fields.
+    Supports conditional requests (ETag / Last-Modified from `update_date`).
     """
-    company = await crud.company.get(db, id=company_id)
+    company = await crud.company.get(db, id=company_id, columns=_row_columns(fields))
     if not company:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company not found",
         )
-    return company
+    return _company_response(request, company_id, company, fields)
 
 
-@router.put("/{company_id}", response_model=schemas.Company)
+@router.put(
+    "/{company_id}", response_model=schemas.Company, dependencies=[Depends(deps.reads_own_writes)]
+)
 async def update_company(
     *,
     db: AsyncSession = Depends(deps.get_db),
@@ -129,7 +500,9 @@ async def update_company(
     return company
 
 
-@router.delete("/{company_id}", response_model=schemas.Company)
+@router.delete(
+    "/{company_id}", response_model=schemas.Company, dependencies=[Depends(deps.reads_own_writes)]
+)
 async def delete_company(
     *,
     db: AsyncSession = Depends(deps.get_db),
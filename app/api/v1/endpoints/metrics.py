@@ -0,0 +1,270 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app import crud
+from app.api.v1 import deps
+from app.core.changefeed import company_feed
+from app.core.hashing import password_hasher
+from app.core.metrics import Exposition, request_metrics
+from app.core.notifications import notification_dispatcher
+from app.core.throttle import login_throttle
+from app.db.invalidation import invalidation_bus
+from app.db.replica import replica_router
+from app.db.session import get_engine
+from app.db.tracing import query_tracer
+
+router = APIRouter(dependencies=[Depends(deps.require_metrics_access)])
+# Mounted at the application root as /metrics for Prometheus scrapers
+prometheus_router = APIRouter(dependencies=[Depends(deps.require_metrics_access)])
+
+
+def _caches() -> Dict[str, Any]:
+    return {
+        "auth_token": deps.token_cache,
+        "auth_principal": crud.user.principal_cache,
+        "company_count": crud.company.count_cache,
+    }
+
+
+@router.get("/hashing")
+async def read_hashing_metrics() -> Dict[str, Any]:
+    """
+    Password hashing pool: queue depth, in-flight work and latency.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/notifications")
+async def read_notification_metrics() -> Dict[str, Any]:
+    """
+    Discord notification dispatcher: queue size, delivered, dropped and
+    rate-limited counts.
+    """
+    return notification_dispatcher.stats()
+
+
+@router.get("/company-feed")
+async def read_company_feed_metrics() -> Dict[str, Any]:
+    """
+    Company change feed: subscribers, published events, slow consumers
+    dropped and resumes that needed a reset.
+    """
+    return company_feed.stats()
+
+
+@router.get("/company-reads")
+async def read_company_read_metrics() -> Dict[str, Any]:
+    """
+    Company read coalescing: queries executed, requests that shared an
+    in-flight query instead, and shared queries that timed out.
+    """
+    return crud.company.read_flight.stats()
+
+
+@router.get("/login-throttle")
+async def read_login_throttle_metrics() -> Dict[str, Any]:
+    """
+    Login throttling: rejected attempts, lockouts and tracked keys.
+    """
+    return login_throttle.stats()
+
+
+@router.get("/token-revocation")
+async def read_token_revocation_metrics() -> Dict[str, Any]:
+    """
+    Revocation filter: size, checks and how many needed a database lookup.
+    """
+    return crud.revoked_token.stats()
+
+
+@router.get("/caches")
+async def read_cache_metrics() -> Dict[str, Any]:
+    """
+    Size and hit/miss counters of the in-process caches.
+    """
+    return {name: cache.stats() for name, cache in _caches().items()}
+
+
+@router.get("/cache-invalidation")
+async def read_cache_invalidation_metrics() -> Dict[str, Any]:
+    """
+    Cross-worker invalidation bus: listener state, reconnects (each flushes
+    the caches) and notifications sent and received.
+    """
+    return invalidation_bus.stats()
+
+
+@router.get("/db-pool")
+async def read_db_pool_metrics() -> Dict[str, Any]:
+    """
+    Connection pool of this worker: checked-out and idle connections,
+    overflow, checkout latency and timeouts.
+    """
+    return get_engine().pool.stats()
+
+
+@router.get("/db-replica")
+async def read_db_replica_metrics() -> Dict[str, Any]:
+    """
+    Read replica routing: measured lag, reads sent to the replica and reads
+    kept on the primary (client wrote recently, or replica lagging).
+    """
+    return replica_router.stats()
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_prometheus_metrics() -> PlainTextResponse:
+    """
+    All metrics of this worker in Prometheus text format.
+    """
+    exposition = Exposition()
+    exposition.add_request_metrics(request_metrics)
+
+    hasher = password_hasher.stats()
+    exposition.add(
+        "password_hash_queue_depth", "gauge", "Hash operations waiting for a worker.",
+        [({}, hasher["queue_depth"])],
+    )
+    exposition.add(
+        "password_hash_in_flight", "gauge", "Hash operations currently running.",
+        [({}, hasher["in_flight"])],
+    )
+    exposition.add(
+        "password_hash_completed_total", "counter", "Completed hash operations.",
+        [({}, hasher["completed"])],
+    )
+    exposition.add(
+        "password_hash_rejected_total", "counter", "Hash operations rejected as busy.",
+        [({}, hasher["rejected"])],
+    )
+    exposition.add_histogram(
+        "password_hash_duration_seconds", "Time spent hashing or verifying.",
+        [({}, password_hasher.run_seconds)],
+    )
+    exposition.add_histogram(
+        "password_hash_queue_wait_seconds", "Time hash operations waited for a worker.",
+        [({}, password_hasher.wait_seconds)],
+    )
+
+    caches = {name: cache.stats() for name, cache in _caches().items()}
+    for key, kind, help in (
+        ("size", "gauge", "Entries held by the in-process cache."),
+        ("hits", "counter", "Cache hits."),
+        ("misses", "counter", "Cache misses."),
+        ("evictions", "counter", "Entries evicted to stay within maxsize."),
+    ):
+        name = "cache_size" if key == "size" else f"cache_{key}_total"
+        exposition.add(
+            name, kind, help, (({"cache": cache}, stats[key]) for cache, stats in caches.items())
+        )
+
+    db_pool = get_engine().pool
+    pool = db_pool.stats()
+    for key, kind, help in (
+        ("checked_out", "gauge", "Connections checked out of the pool."),
+        ("idle", "gauge", "Idle connections in the pool."),
+        ("overflow", "gauge", "Connections opened beyond pool_size."),
+        ("checkouts", "counter", "Successful connection checkouts."),
+        ("checkout_timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+    ):
+        name = f"db_pool_{key}" + ("_total" if kind == "counter" else "")
+        exposition.add(name, kind, help, [({}, pool[key])])
+    exposition.add_histogram(
+        "db_pool_checkout_duration_seconds", "Time taken to check out a connection.",
+        [({}, db_pool.checkout_seconds)],
+    )
+    replica = replica_router.stats()
+    exposition.add(
+        "db_read_sessions_total", "counter", "Read-only sessions by database and reason.",
+        [
+            ({"target": "replica", "reason": "current"}, replica["replica_reads"]),
+            ({"target": "primary", "reason": "sticky"}, replica["sticky_primary_reads"]),
+            ({"target": "primary", "reason": "lagging"}, replica["lagging_primary_reads"]),
+        ],
+    )
+    if replica["lag_seconds"] is not None:
+        exposition.add(
+            "db_replica_lag_seconds", "gauge", "Replication lag at the last check.",
+            [({}, replica["lag_seconds"])],
+        )
+    reads = crud.company.read_flight.stats()
+    exposition.add(
+        "company_reads_total", "counter",
+        "Company reads by whether they ran a query or shared one in flight.",
+        [
+            ({"outcome": "executed"}, reads["executed"]),
+            ({"outcome": "coalesced"}, reads["coalesced"]),
+        ],
+    )
+    exposition.add(
+        "company_read_timeouts_total", "counter",
+        "Shared company reads that exceeded COMPANY_READ_COALESCE_TIMEOUT_SECONDS.",
+        [({}, reads["timeouts"])],
+    )
+    exposition.add(
+        "company_reads_in_flight", "gauge", "Company queries currently shared in flight.",
+        [({}, reads["in_flight"])],
+    )
+    invalidation = invalidation_bus.stats()
+    exposition.add(
+        "cache_invalidation_listener_up", "gauge",
+        "Whether the cache invalidation listener is connected.",
+        [({}, int(invalidation["connected"]))],
+    )
+    for key, help in (
+        ("connects", "Cache invalidation listener connections (each flushes the caches)."),
+        ("sent", "Cache invalidations published by this worker."),
+        ("received", "Cache invalidations received from other workers."),
+    ):
+        exposition.add(
+            f"cache_invalidation_{key}_total", "counter", help, [({}, invalidation[key])]
+        )
+    notifications = notification_dispatcher.stats()
+    exposition.add(
+        "notifications_queued", "gauge", "Discord notifications waiting to be sent.",
+        [({}, notifications["queued"])],
+    )
+    for key, help in (
+        ("sent", "Discord notifications delivered."),
+        ("dropped", "Discord notifications dropped because the queue was full."),
+        ("failed", "Discord notifications that could not be delivered."),
+        ("rate_limited", "Discord API calls answered with 429."),
+    ):
+        exposition.add(
+            f"notifications_{key}_total", "counter", help, [({}, notifications[key])]
+        )
+    feed = company_feed.stats()
+    exposition.add(
+        "company_feed_subscribers", "gauge", "Open change feed connections.",
+        [({}, feed["subscribers"])],
+    )
+    for key, help in (
+        ("published", "Company change events published."),
+        ("dropped_subscribers", "Change feed subscribers dropped for falling behind."),
+        ("resets", "Change feed resumes that could not be replayed."),
+    ):
+        exposition.add(f"company_feed_{key}_total", "counter", help, [({}, feed[key])])
+    throttle = login_throttle.stats()
+    exposition.add(
+        "login_throttle_rejected_total", "counter", "Login attempts rejected by the throttle.",
+        [({}, throttle["rejected"])],
+    )
+    exposition.add(
+        "login_throttle_lockouts_total", "counter", "Accounts or addresses locked out.",
+        [({}, throttle["lockouts"])],
+    )
+    exposition.add(
+        "db_slow_queries_total", "counter", "Statements slower than DB_SLOW_QUERY_MS.",
+        [({}, query_tracer.slow_queries)],
+    )
+    exposition.add(
+        "db_query_budget_exceeded_total", "counter",
+        "Requests that made more queries than their route's budget.",
+        (
+            ({"method": method, "route": route}, count)
+            for (method, route), count in sorted(query_tracer.budget_exceeded.items())
+        ),
+    )
+    return PlainTextResponse(exposition.render(), media_type=Exposition.content_type)
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A small in-process cache with per-entry expiry and LRU eviction.
+
+    Memory is bounded by `maxsize`; entries older than their TTL are treated as
+    missing. Not thread-safe: it is meant to be used from the event loop only.
+
+    `generation` changes on every pop or clear. A caller that loads a value
+    across an await can pass the generation it saw before loading to `set`,
+    so a value read before a concurrent invalidation is not cached after it.
+    """
+
+    def __init__(
+        self, *, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._timer():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self, key: K, value: V, ttl: Optional[float] = None, generation: Optional[int] = None
+    ) -> None:
+        if self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (self._timer() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,186 @@
+import asyncio
+import secrets
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from app.core.config import settings
+from app.core.serialization import CompanyRow
+
+
+class ChangeEventDocument(TypedDict):
+    id: str
+    type: str
+    company: CompanyRow
+
+
+class BulkChangeEventDocument(TypedDict):
+    id: str
+    type: str
+    created: List[CompanyRow]
+    updated: List[CompanyRow]
+
+
+_event_adapter = TypeAdapter(ChangeEventDocument)
+_bulk_event_adapter = TypeAdapter(BulkChangeEventDocument)
+
+
+class ChangeEvent:
+    """A published change, serialized once however many subscribers receive it."""
+
+    __slots__ = ("id", "seq", "type", "data")
+
+    def __init__(self, id: str, seq: int, type: str, data: bytes) -> None:
+        self.id = id
+        self.seq = seq
+        self.type = type
+        self.data = data
+
+
+class SlowConsumer(Exception):
+    """The subscriber's buffer overflowed and it was dropped."""
+
+
+_DROPPED = object()
+
+
+class Subscription:
+    """
+    One subscriber: events missed before it connected (`backlog`), then live
+    events through a bounded queue. `reset` means the requested resume point
+    is no longer available and the client must refetch the current state.
+    """
+
+    def __init__(self, maxsize: int, backlog: List[ChangeEvent], reset: bool) -> None:
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize)
+        self.backlog: Deque[ChangeEvent] = deque(backlog)
+        self.reset = reset
+        self.dropped = False
+
+    def push(self, event: ChangeEvent) -> bool:
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Anything still queued would be replayed on resume anyway, so make
+            # room for the marker that ends this subscriber's stream
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_DROPPED)
+            return False
+        return True
+
+    async def next(self, timeout: float) -> Optional[ChangeEvent]:
+        """The next event, or None if none arrived within `timeout` seconds."""
+        if self.backlog:
+            return self.backlog.popleft()
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if item is _DROPPED:
+            raise SlowConsumer()
+        return item
+
+
+class ChangeFeed:
+    """
+    In-process broadcast of company changes to live subscribers (SSE and
+    WebSocket clients of this worker).
+
+    Event ids are `<boot id>-<sequence>`. The last `history` events are kept
+    so a client reconnecting with its last event id can catch up; an id from
+    another process or one that fell out of the history yields a reset.
+    A subscriber that falls more than `buffer` events behind is dropped
+    rather than slowing down publishers or holding unbounded memory.
+    """
+
+    def __init__(self, *, history: int, buffer: int, max_subscribers: int) -> None:
+        self.boot_id = secrets.token_hex(4)
+        self.seq = 0
+        self.buffer = buffer
+        self.max_subscribers = max_subscribers
+        self.history: Deque[ChangeEvent] = deque(maxlen=history)
+        self.subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+        self.resets = 0
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self.boot_id}-{self.seq}"
+
+    @property
+    def full(self) -> bool:
+        return len(self.subscribers) >= self.max_subscribers
+
+    def publish(self, type: str, company: Dict[str, Any]) -> ChangeEvent:
+        return self._broadcast(type, _event_adapter, {"company": company})
+
+    def publish_bulk(
+        self, created: List[Dict[str, Any]], updated: List[Dict[str, Any]]
+    ) -> ChangeEvent:
+        """
+        One `bulk` event for a batch write, however many rows it touched, so
+        an import neither overflows subscriber buffers nor the history.
+        """
+        return self._broadcast(
+            "bulk", _bulk_event_adapter, {"created": created, "updated": updated}
+        )
+
+    def _broadcast(self, type: str, adapter: TypeAdapter, fields: Dict[str, Any]) -> ChangeEvent:
+        self.seq += 1
+        event_id = self.last_event_id
+        data = adapter.dump_json({"id": event_id, "type": type, **fields})
+        event = ChangeEvent(event_id, self.seq, type, data)
+        self.history.append(event)
+        self.published += 1
+        for subscription in list(self.subscribers):
+            if not subscription.push(event):
+                self.subscribers.discard(subscription)
+                self.dropped += 1
+        return event
+
+    def _backlog(self, last_event_id: Optional[str]) -> Tuple[List[ChangeEvent], bool]:
+        if not last_event_id:
+            return [], False
+        boot_id, _, seq = last_event_id.rpartition("-")
+        if boot_id != self.boot_id or not seq.isdigit() or int(seq) > self.seq:
+            return [], True
+        seq_after = int(seq)
+        oldest = self.history[0].seq if self.history else self.seq + 1
+        if seq_after < oldest - 1:
+            return [], True
+        return [event for event in self.history if event.seq > seq_after], False
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        backlog, reset = self._backlog(last_event_id)
+        if reset:
+            self.resets += 1
+        subscription = Subscription(self.buffer, backlog, reset)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "history": len(self.history),
+            "dropped_subscribers": self.dropped,
+            "resets": self.resets,
+            "last_event_id": self.last_event_id,
+        }
+
+
+company_feed = ChangeFeed(
+    history=settings.COMPANY_FEED_HISTORY,
+    buffer=settings.COMPANY_FEED_SUBSCRIBER_BUFFER,
+    max_subscribers=settings.COMPANY_FEED_MAX_SUBSCRIBERS,
+)
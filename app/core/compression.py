@@ -0,0 +1,79 @@
+import importlib
+import zlib
+from functools import lru_cache
+
+from app.core.config import settings
+
+# Media types worth compressing besides text/*. text/event-stream is left
+# alone so events are not held back in a compressor's buffer.
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "application/javascript",
+}
+
+# Optional packages providing each coding; gzip is in the standard library
+_ENCODING_MODULES = {"br": "brotli", "zstd": "zstandard"}
+
+
+@lru_cache(maxsize=None)
+def _module(encoding: str):
+    try:
+        return importlib.import_module(_ENCODING_MODULES[encoding])
+    except ImportError:
+        return None
+
+
+def is_available(encoding: str) -> bool:
+    if encoding == "gzip":
+        return True
+    return encoding in _ENCODING_MODULES and _module(encoding) is not None
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type.startswith("text/"):
+        return media_type != "text/event-stream"
+    return media_type in COMPRESSIBLE_TYPES
+
+
+class Compressor:
+    """
+    Incremental compressor for one response. `compress(chunk, flush=True)`
+    returns output that the client can decode up to the end of `chunk`,
+    which streamed responses need.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "gzip":
+            # wbits 31 = gzip container
+            self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = _module("br").Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == "zstd":
+            zstandard = _module("zstd")
+            self._zstd = zstandard
+            self._obj = zstandard.ZstdCompressor(
+                level=settings.COMPRESSION_ZSTD_LEVEL
+            ).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, chunk: bytes, *, flush: bool = False) -> bytes:
+        if self.encoding == "gzip":
+            data = self._obj.compress(chunk)
+            return data + self._obj.flush(zlib.Z_SYNC_FLUSH) if flush else data
+        if self.encoding == "br":
+            data = self._obj.process(chunk)
+            return data + self._obj.flush() if flush else data
+        data = self._obj.compress(chunk)
+        if flush:
+            data += self._obj.flush(self._zstd.COMPRESSOBJ_FLUSH_BLOCK)
+        return data
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
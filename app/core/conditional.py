@@ -0,0 +1,65 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi import Response
+
+from app.core.config import settings
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak ETag from the values that determine a response. Weak, because
+    equivalent JSON documents need not be byte-identical.
+    """
+    digest = hashlib.blake2b(
+        "\x1f".join(str(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Company timestamps are stored as naive UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    if settings.COMPANY_CACHE_CONTROL:
+        headers["Cache-Control"] = settings.COMPANY_CACHE_CONTROL
+    return headers
+
+
+def _opaque_tag(tag: str) -> str:
+    # Weak comparison: W/"x" and "x" match
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(
+    request_headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    Whether the client's cached copy is current. If-None-Match takes
+    precedence; If-Modified-Since is only used when it is absent.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+        return "*" in tags or _opaque_tag(etag) in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second precision
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
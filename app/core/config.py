@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl
 import os
@@ -14,14 +16,137 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Revoked token ids are checked against an in-memory Bloom filter that is
+    # refreshed from the database every SYNC_SECONDS
+    TOKEN_REVOCATION_FILTER_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0
     ALGORITHM: str = "HS256"
 
+    # Connection pool (per worker). Pre-ping costs a round trip per checkout;
+    # with a pool_recycle below the server's idle timeout it can be turned off.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = True
+    # Server-side statement_timeout in milliseconds, 0 = no limit
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Read replica for read-only endpoints, off when no URL is set. A client that
+    # wrote gets a cookie keeping its reads on the primary for STICKY_SECONDS;
+    # so do the up to STICKY_MAXSIZE users who wrote with a bearer token.
+    # Reads also fall back to the primary while the replica is more than
+    # MAX_LAG_SECONDS behind, checked every LAG_CHECK_SECONDS (0 = never check).
+    DATABASE_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_STICKY_SECONDS: float = 5.0
+    DB_REPLICA_STICKY_COOKIE: str = "iqx_read_primary_until"
+    DB_REPLICA_STICKY_MAXSIZE: int = 10000
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 2.0
+
+    # Query tracing. Statements slower than DB_SLOW_QUERY_MS (0 = off) are logged,
+    # with EXPLAIN ANALYZE output if enabled (this runs them twice, in a savepoint
+    # that is rolled back). Only company reads opt in to being explained.
+    # Requests issuing more than their budget of queries are flagged; budgets are
+    # per route as {"PUT /api/v1/companies/{company_id}": 4}, 0 = no budget.
+    DB_SLOW_QUERY_MS: float = 200.0
+    DB_SLOW_QUERY_EXPLAIN: bool = False
+    DB_QUERY_BUDGET: int = 10
+    DB_QUERY_BUDGETS: dict[str, int] = {}
+
+    # Authenticated-principal cache; the TTL bounds how stale a cached user can be
+    AUTH_CACHE_MAXSIZE: int = 10_000
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+
+    # Failed-login throttling per account and per client address. More than
+    # LIMIT failures in a sliding WINDOW locks the key out for LOCKOUT seconds,
+    # doubling on each repeated lockout up to MAX_LOCKOUT. Keys idle for
+    # FORGET seconds are dropped; STORE is a dotted path to a ThrottleStore.
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = 300.0
+    LOGIN_THROTTLE_ACCOUNT_LIMIT: int = 5
+    LOGIN_THROTTLE_IP_LIMIT: int = 20
+    LOGIN_THROTTLE_LOCKOUT_SECONDS: float = 30.0
+    LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS: float = 900.0
+    LOGIN_THROTTLE_FORGET_SECONDS: float = 3600.0
+    LOGIN_THROTTLE_MAXSIZE: int = 100_000
+    LOGIN_THROTTLE_STORE: str = "app.core.throttle.MemoryThrottleStore"
+
+    # Password hashing. The first scheme hashes new passwords, the rest are
+    # accepted and upgraded on login, as are hashes below the configured cost.
+    # With a target > 0 the first scheme's cost is raised at startup as far as
+    # one hash fits in that many milliseconds on this machine.
+    PASSWORD_HASH_SCHEMES: list[str] = ["bcrypt"]
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_PBKDF2_ROUNDS: int = 600_000
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_HASH_TARGET_MS: float = 0.0
+
+    # Password hashing pool ("thread", "process" or "inline"); 0 workers = min(4, CPUs)
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process", "inline"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Companies
+    COMPANY_COUNT_CACHE_TTL_SECONDS: float = 60.0
+    COMPANY_COUNT_CACHE_MAXSIZE: int = 1024
+    COMPANY_BATCH_MAX_KEYS: int = 200
+    COMPANY_IMPORT_BATCH_SIZE: int = 500
+    COMPANY_IMPORT_MAX_ERRORS: int = 100
+    # List pages omit business_descriptions unless it is requested via fields=
+    COMPANY_LIST_DEFER_DESCRIPTIONS: bool = True
+    # Cache-Control sent with company reads (empty = none). "no-cache" lets
+    # clients keep responses but revalidate them with ETag / Last-Modified.
+    COMPANY_CACHE_CONTROL: str = "no-cache"
+    # Concurrent identical company reads (by id or symbol, list and search
+    # pages) share one query; one running longer than the timeout fails its
+    # waiters with 503 and the next request starts a new one
+    COMPANY_READ_COALESCING: bool = True
+    COMPANY_READ_COALESCE_TIMEOUT_SECONDS: float = 10.0
+    # Change feed (per worker): events kept for resuming, events a subscriber
+    # may fall behind before it is dropped, and the keepalive interval
+    COMPANY_FEED_HISTORY: int = 1000
+    COMPANY_FEED_SUBSCRIBER_BUFFER: int = 256
+    COMPANY_FEED_MAX_SUBSCRIBERS: int = 1000
+    COMPANY_FEED_HEARTBEAT_SECONDS: float = 15.0
+
+    # Cross-worker cache invalidation over Postgres LISTEN/NOTIFY. Each worker
+    # keeps one listening connection, to DATABASE_URL unless DSN is set (it
+    # must not go through a transaction-pooling bouncer), pinged every PING
+    # seconds and re-established after RECONNECT seconds, backing off.
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_CHANNEL: str = "iqx_cache_invalidation"
+    CACHE_INVALIDATION_DSN: Optional[str] = None
+    CACHE_INVALIDATION_PING_SECONDS: float = 10.0
+    CACHE_INVALIDATION_RECONNECT_SECONDS: float = 1.0
+
+    # Response compression, by the client's Accept-Encoding. Codings are tried
+    # in this order on equal quality; br and zstd need the brotli / zstandard
+    # packages (poetry install --extras encodings) and are skipped without
+    # them. Bodies sent in one piece below MINIMUM_SIZE bytes go out as is.
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Metrics (/metrics and /api/v1/metrics/*) are served to admins' access
+    # tokens and, when set, to this token sent as a bearer token by scrapers
+    METRICS_TOKEN: str = ""
+
     # CORS
     BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
     
     # Discord
     DISCORD_BOT_TOKEN: str = ""
     DISCORD_NOTIFICATION_CHANNEL_ID: int = 0
+    # Messages arriving within the interval are sent together as one API call
+    DISCORD_BATCH_INTERVAL_SECONDS: float = 2.0
+    DISCORD_QUEUE_MAXSIZE: int = 1000
+    DISCORD_MAX_RETRIES: int = 5
+    DISCORD_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
 
     class Config:
         env_file = ".env"
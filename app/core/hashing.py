@@ -0,0 +1,129 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already queued."""
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    # Runs inside the worker so the measured time excludes queueing
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification in a worker pool so bcrypt never
+    blocks the event loop.
+
+    `executor` is "thread" (bcrypt releases the GIL, so threads use several
+    cores), "process", or "inline" to hash on the event loop. At most
+    `max_pending` operations may be queued or running; beyond that calls fail
+    fast with PasswordHasherBusy instead of piling up behind the pool.
+    """
+
+    def __init__(self, *, executor: str, workers: int, max_pending: int) -> None:
+        self.executor_kind = executor
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self.context_options = security.context_options_from_settings()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.run_seconds = Histogram()
+        self.wait_seconds = Histogram()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # Imported here so workers using threads never load multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=security.configure_password_context,
+                    initargs=(self.context_options,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            if self.executor_kind == "inline":
+                result, elapsed = _timed(fn, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, elapsed = await loop.run_in_executor(
+                    self._get_executor(), _timed, fn, *args
+                )
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.run_seconds.observe(elapsed)
+        self.wait_seconds.observe(max(0.0, time.perf_counter() - start - elapsed))
+        return result
+
+    def configure(self, context_options: Dict[str, Any]) -> None:
+        """Switch hashing parameters, restarting worker processes to pick them up."""
+        self.context_options = context_options
+        security.configure_password_context(context_options)
+        if self.executor_kind == "process":
+            self.shutdown()
+
+    def needs_update(self, hashed_password: str) -> bool:
+        # Only parses the hash, cheap enough for the event loop
+        return security.password_needs_update(hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(security.verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        running = min(self.pending, self.workers)
+        scheme = self.context_options["schemes"][0]
+        cost_option = security.COST_OPTIONS.get(scheme)
+        return {
+            "scheme": scheme,
+            "cost": self.context_options.get(f"{scheme}__{cost_option}"),
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self.pending - running,
+            "in_flight": running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds": self.run_seconds.snapshot(),
+            "queue_wait_seconds": self.wait_seconds.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,180 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow bcrypt runs
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Observing is a bisect and two additions, so it is
+    cheap enough for per-request use without locking.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # One extra slot for observations above the largest bucket (+Inf)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (0 when empty)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+Labels = Mapping[str, str]
+
+
+class RouteStats:
+    __slots__ = ("responses", "errors", "latency")
+
+    def __init__(self) -> None:
+        # Response counts by status code
+        self.responses: Dict[int, int] = {}
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class RequestMetrics:
+    """
+    Per-route HTTP counters. Everything is updated from the event loop
+    thread, so plain dict and int updates are safe without locks.
+    """
+
+    def __init__(self) -> None:
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        # Event streams currently open; counted apart from in_flight
+        self.streams_open = 0
+
+    def record(
+        self, method: str, route: str, status_code: int, seconds: float, streamed: bool = False
+    ) -> None:
+        """
+        Count a finished response. Event streams last as long as the client
+        stays subscribed, so their duration is kept out of the latency histogram.
+        """
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.responses[status_code] = stats.responses.get(status_code, 0) + 1
+        if status_code >= 500:
+            stats.errors += 1
+        if not streamed:
+            stats.latency.observe(seconds)
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Builds a Prometheus text-format (0.0.4) document."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def add(
+        self, name: str, kind: str, help: str, samples: Iterable[Tuple[Labels, float]]
+    ) -> None:
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def add_histogram(
+        self, name: str, help: str, series: Iterable[Tuple[Labels, Histogram]]
+    ) -> None:
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in series:
+            cumulative = 0
+            bounds = list(histogram.buckets) + [float("inf")]
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(float(bound))}
+                self.lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            self.lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            self.lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def add_request_metrics(self, metrics: RequestMetrics) -> None:
+        routes = sorted(metrics.routes.items())
+        self.add(
+            "http_requests_total",
+            "counter",
+            "HTTP responses by route template and status code.",
+            (
+                ({"method": method, "route": route, "status": str(code)}, count)
+                for (method, route), stats in routes
+                for code, count in sorted(stats.responses.items())
+            ),
+        )
+        self.add(
+            "http_request_errors_total",
+            "counter",
+            "HTTP requests that failed with a 5xx status or an unhandled exception.",
+            (({"method": method, "route": route}, stats.errors) for (method, route), stats in routes),
+        )
+        self.add(
+            "http_requests_in_flight",
+            "gauge",
+            "HTTP requests currently being handled.",
+            [({}, metrics.in_flight)],
+        )
+        self.add(
+            "http_streams_open",
+            "gauge",
+            "Server-Sent Events streams currently open.",
+            [({}, metrics.streams_open)],
+        )
+        self.add_histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by route template, excluding event streams.",
+            (({"method": method, "route": route}, stats.latency) for (method, route), stats in routes),
+        )
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,241 @@
+import math
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import Compressor, is_compressible
+from app.core.config import settings
+from app.core.metrics import RequestMetrics, request_metrics
+from app.core.negotiation import choose_encoding
+from app.db.replica import (
+    READS_OWN_WRITES_STATE_KEY,
+    WRITER_STATE_KEY,
+    ReplicaRouter,
+    replica_router,
+)
+from app.db.tracing import QueryStats, QueryTracer, current_query_stats, query_tracer
+
+# Label for requests that did not match any route, so scanners probing random
+# paths cannot blow up the number of series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route counts, errors, in-flight requests
+    and latency. The route label is the matched path template (e.g.
+    `/api/v1/companies/{company_id}`), never the raw path.
+
+    Server-Sent Events responses (the company change feed) are counted as open
+    streams instead of in-flight requests, and not timed. WebSockets are not
+    HTTP requests and are left alone.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streamed = False
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, streamed
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type", "")
+                if content_type.startswith("text/event-stream"):
+                    streamed = True
+                    self.metrics.in_flight -= 1
+                    self.metrics.streams_open += 1
+            await send(message)
+
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            status_code = 500
+            raise
+        finally:
+            if streamed:
+                self.metrics.streams_open -= 1
+            else:
+                self.metrics.in_flight -= 1
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            self.metrics.record(
+                scope["method"],
+                getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code,
+                time.perf_counter() - start,
+                streamed=streamed,
+            )
+
+
+class QueryTracingMiddleware:
+    """
+    Counts the database queries of each request, reports them in a
+    `Server-Timing` header and checks them against the route's query budget.
+
+    Queries made after the response headers were sent (e.g. while streaming a
+    body) count towards the budget but not the header.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: QueryTracer = query_tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            route = scope.get("route")
+            self.tracer.check_budget(
+                scope["method"], getattr(route, "path", None) or UNMATCHED_ROUTE, stats
+            )
+
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReadYourWritesMiddleware:
+    """
+    After a successful write to data read from the replica (routes depending
+    on reads_own_writes), sets a cookie holding the time until which the
+    client's reads stay on the primary, so it sees its own writes even while
+    the replica catches up. A cookie rather than per-worker state, so the next
+    request may land on any worker.
+
+    API clients often keep no cookies, so the authenticated user of the write
+    (see get_current_user) is also marked as a recent writer before the
+    response goes out.
+    """
+
+    def __init__(self, app: ASGIApp, router: ReplicaRouter = replica_router) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in WRITE_METHODS
+            or not self.router.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            state = scope.get("state", {})
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and state.get(READS_OWN_WRITES_STATE_KEY)
+            ):
+                subject = state.get(WRITER_STATE_KEY)
+                if subject is not None:
+                    await self.router.mark_written(subject)
+                window = settings.DB_REPLICA_STICKY_SECONDS
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{settings.DB_REPLICA_STICKY_COOKIE}={time.time() + window:.3f}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with the best coding the client accepts (see
+    choose_encoding). A body sent in one piece below COMPRESSION_MINIMUM_SIZE
+    is left as is, since framing overhead would outweigh the savings.
+    Streamed bodies (exports) are compressed and flushed chunk by chunk, so
+    clients can decode rows as they arrive.
+
+    ETags are weak, so they are passed through unchanged and still match the
+    client's If-None-Match whichever coding it received.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows how large it is
+                    start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < settings.COMPRESSION_MINIMUM_SIZE:
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+                compressor = Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start)
+
+            data = compressor.compress(body, flush=more_body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
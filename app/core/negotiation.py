@@ -0,0 +1,64 @@
+from typing import Dict, Optional
+
+from app.core.compression import is_available
+from app.core.config import settings
+from app.core.serialization import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, msgpack_available
+
+
+def parse_qualities(header: str) -> Dict[str, float]:
+    """`a, b;q=0.5` -> {"a": 1.0, "b": 0.5}, names lowercased."""
+    qualities: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The content coding for a response: the highest quality among the
+    configured codings that are installed, the configured order breaking
+    ties. None to send the body as is.
+    """
+    if not accept_encoding:
+        return None
+    qualities = parse_qualities(accept_encoding)
+    best: Optional[str] = None
+    best_quality = 0.0
+    for encoding in settings.COMPRESSION_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality and is_available(encoding):
+            best, best_quality = encoding, quality
+    return best
+
+
+def _media_quality(qualities: Dict[str, float], *media_types: str) -> float:
+    for media_type in media_types:
+        if media_type in qualities:
+            return qualities[media_type]
+    return qualities.get("application/*", qualities.get("*/*", 0.0))
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    JSON, or MessagePack when the client prefers it over JSON and msgpack is
+    installed. Anything else gets JSON rather than a 406.
+    """
+    if not accept or not msgpack_available():
+        return JSON_MEDIA_TYPE
+    qualities = parse_qualities(accept)
+    msgpack_quality = _media_quality(qualities, MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+    if msgpack_quality > _media_quality(qualities, JSON_MEDIA_TYPE):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
@@ -1,61 +1,331 @@
-import discord
 import asyncio
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Khởi tạo client Discord
-client = discord.Client(intents=discord.Intents.default())
-is_ready = asyncio.Event()
-
-@client.event
-async def on_ready():
-    """Được gọi khi client Discord đã sẵn sàng."""
-    logger.info(f"Discord bot đã đăng nhập thành công dưới tên {client.user}")
-    is_ready.set()
-
-async def send_discord_notification(message: str, channel_id: Optional[int] = None) -> bool:
-    """
-    Gửi thông báo đến kênh Discord được chỉ định.
-    
-    Args:
-        message: Nội dung tin nhắn cần gửi
-        channel_id: ID kênh Discord (nếu không cung cấp, sẽ sử dụng kênh mặc định từ cấu hình)
-    
-    Returns:
-        bool: True nếu gửi thành công, False nếu thất bại
-    """
-    if not settings.DISCORD_BOT_TOKEN or not (channel_id or settings.DISCORD_NOTIFICATION_CHANNEL_ID):
-        logger.warning("Thiếu cấu hình Discord. Không thể gửi thông báo.")
-        return False
-    
-    target_channel_id = channel_id or settings.DISCORD_NOTIFICATION_CHANNEL_ID
-    
-    try:
-        # Khởi động client nếu chưa đăng nhập
-        if not client.is_ready():
-            # Chạy client trong một task riêng biệt
-            asyncio.create_task(client.start(settings.DISCORD_BOT_TOKEN))
-            # Đợi cho đến khi client sẵn sàng, tối đa 10 giây
-            await asyncio.wait_for(is_ready.wait(), timeout=10.0)
-        
-        # Lấy kênh và gửi tin nhắn
-        channel = client.get_channel(target_channel_id)
-        if not channel:
-            logger.error(f"Không tìm thấy kênh Discord với ID {target_channel_id}")
+# Giới hạn của Discord cho mỗi tin nhắn
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+# Tổng số ký tự (tiêu đề + mô tả) của mọi embed trong một tin nhắn
+MESSAGE_CHARACTER_LIMIT = 6000
+
+REGISTRATION_TITLE = "🎉 Thành viên đăng ký thành công !"
+
+
+class RateLimited(Exception):
+    """Discord trả về 429; `retry_after` là số giây cần chờ."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limited, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class DiscordTransport(Protocol):
+    async def start(self) -> None: ...
+
+    async def send(self, channel_id: int, embeds: List[Dict[str, Any]]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class DiscordHTTPTransport:
+    """
+    Gửi tin nhắn qua REST API của Discord bằng discord.py, không mở kết nối
+    gateway nên không phải chờ `on_ready`.
+    """
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self._client = None
+
+    async def start(self) -> None:
+        # Import khi cần để app không phải tải discord/aiohttp lúc khởi động
+        import discord
+
+        # Các lần chờ rate limit dài hơn 30s được trả về dispatcher thay vì ngủ trong discord.py
+        self._client = discord.Client(
+            intents=discord.Intents.none(), max_ratelimit_timeout=30.0
+        )
+        await self._client.login(self.token)
+
+    async def send(self, channel_id: int, embeds: List[Dict[str, Any]]) -> None:
+        import discord
+
+        channel = self._client.get_partial_messageable(channel_id)
+        try:
+            await channel.send(embeds=[discord.Embed.from_dict(embed) for embed in embeds])
+        except discord.RateLimited as exc:
+            raise RateLimited(exc.retry_after) from exc
+        except discord.HTTPException as exc:
+            if exc.status != 429:
+                raise
+            retry_after = float(exc.response.headers.get("Retry-After", 1.0))
+            raise RateLimited(retry_after) from exc
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class FakeDiscordTransport:
+    """
+    Transport giả lập để test và benchmark không cần mạng: ghi lại các tin
+    nhắn, mô phỏng độ trễ, trả về 429 khi vượt `rate_limit` lần gọi trong
+    mỗi `rate_window` giây và từ chối tin nhắn vượt giới hạn như Discord (400).
+    """
+
+    def __init__(
+        self, *, latency: float = 0.0, rate_limit: int = 0, rate_window: float = 1.0
+    ) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.sent: List[Tuple[int, List[Dict[str, Any]]]] = []
+        self.calls = 0
+        self.rate_limited = 0
+        self._window_start = 0.0
+        self._window_calls = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def send(self, channel_id: int, embeds: List[Dict[str, Any]]) -> None:
+        self.calls += 1
+        if (
+            len(embeds) > EMBEDS_PER_MESSAGE
+            or sum(_embed_size(embed) for embed in embeds) > MESSAGE_CHARACTER_LIMIT
+        ):
+            raise ValueError("400 Bad Request: embed size exceeds maximum size of 6000")
+        if self.rate_limit:
+            now = asyncio.get_running_loop().time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_calls = now, 0
+            if self._window_calls >= self.rate_limit:
+                self.rate_limited += 1
+                raise RateLimited(self._window_start + self.rate_window - now)
+            self._window_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((channel_id, embeds))
+
+    async def close(self) -> None:
+        pass
+
+
+def _build_embeds(title: str, messages: List[str]) -> List[Tuple[Dict[str, Any], int]]:
+    """Các embed kèm số tin nhắn được gộp vào mỗi embed."""
+    embeds: List[Tuple[Dict[str, Any], int]] = []
+    chunk: List[str] = []
+    size = 0
+    for message in messages:
+        message = message[:EMBED_DESCRIPTION_LIMIT]
+        if chunk and size + 2 + len(message) > EMBED_DESCRIPTION_LIMIT:
+            embeds.append(({"description": "\n\n".join(chunk)}, len(chunk)))
+            chunk, size = [], 0
+        size += (2 if chunk else 0) + len(message)
+        chunk.append(message)
+    if chunk:
+        embeds.append(({"description": "\n\n".join(chunk)}, len(chunk)))
+    for embed, _ in embeds:
+        embed["title"] = f"{title} ({len(messages)})" if len(messages) > 1 else title
+    return embeds
+
+
+def build_embeds(title: str, messages: List[str]) -> List[Dict[str, Any]]:
+    """Gộp các tin nhắn cùng tiêu đề thành ít embed nhất có thể."""
+    return [embed for embed, _ in _build_embeds(title, messages)]
+
+
+def _embed_size(embed: Dict[str, Any]) -> int:
+    return len(embed.get("title", "")) + len(embed.get("description", ""))
+
+
+def pack_messages(embeds: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Chia các embed thành các tin nhắn, mỗi tin tối đa 10 embed và 6000 ký tự,
+    vượt quá thì Discord trả về 400 cho cả tin nhắn.
+    """
+    messages: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    size = 0
+    for embed in embeds:
+        embed_size = _embed_size(embed)
+        if current and (
+            len(current) == EMBEDS_PER_MESSAGE or size + embed_size > MESSAGE_CHARACTER_LIMIT
+        ):
+            messages.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += embed_size
+    if current:
+        messages.append(current)
+    return messages
+
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    """
+    Hàng đợi thông báo Discord chạy suốt vòng đời app.
+
+    `notify` không chờ gửi: tin nhắn được đưa vào hàng đợi có giới hạn (đầy thì
+    bỏ). Worker gom các tin nhắn đến trong `interval` giây, mỗi tiêu đề thành
+    một embed, gửi một lần gọi API cho tối đa 10 embed (và 6000 ký tự) và chờ
+    lại khi bị 429.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[DiscordTransport],
+        *,
+        channel_id: int,
+        max_queue: int = 1000,
+        interval: float = 2.0,
+        max_retries: int = 5,
+    ) -> None:
+        self.transport = transport
+        self.channel_id = channel_id
+        self.max_queue = max_queue
+        self.interval = interval
+        self.max_retries = max_retries
+        # Không giới hạn ở asyncio.Queue để luôn đặt được tín hiệu dừng;
+        # giới hạn `max_queue` được kiểm tra trong notify
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.api_calls = 0
+        self.rate_limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.transport is not None and bool(self.channel_id)
+
+    async def start(self) -> None:
+        if not self.enabled or self._worker is not None:
+            return
+        try:
+            await self.transport.start()
+        except Exception as e:
+            logger.error(f"Không thể đăng nhập Discord, tắt thông báo: {str(e)}")
+            self.transport = None
+            return
+        # Tạo lại hàng đợi trong event loop đang chạy
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run(), name="discord-notifications")
+
+    def notify(
+        self, message: str, *, title: str = "Thông báo", channel_id: Optional[int] = None
+    ) -> bool:
+        """Đưa tin nhắn vào hàng đợi. Trả về False nếu bị bỏ."""
+        if not self.enabled or self._worker is None:
+            logger.warning("Thiếu cấu hình Discord. Không thể gửi thông báo.")
+            return False
+        if self.queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            logger.warning("Hàng đợi thông báo Discord đã đầy, bỏ qua tin nhắn")
             return False
-        
-        await channel.send(message)
+        self.queue.put_nowait((channel_id or self.channel_id, title, message))
         return True
-    
-    except asyncio.TimeoutError:
-        logger.error("Hết thời gian chờ kết nối đến Discord")
-        return False
-    except discord.LoginFailure:
-        logger.error("Token Discord không hợp lệ")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Gửi nốt các tin nhắn còn trong hàng đợi rồi dừng worker."""
+        if self._worker is not None:
+            self.queue.put_nowait(_STOP)
+            try:
+                await asyncio.wait_for(self._worker, timeout)
+            except asyncio.TimeoutError:
+                logger.error(
+                    f"Hết thời gian gửi thông báo Discord, bỏ {self.queue.qsize()} tin nhắn"
+                )
+            self._worker = None
+        if self.transport is not None:
+            await self.transport.close()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.interval
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._deliver(batch)
+
+    async def _deliver(self, batch: List[Tuple[int, str, str]]) -> None:
+        grouped: Dict[int, Dict[str, List[str]]] = {}
+        for channel_id, title, message in batch:
+            grouped.setdefault(channel_id, {}).setdefault(title, []).append(message)
+        for channel_id, by_title in grouped.items():
+            entries = [
+                entry
+                for title, messages in by_title.items()
+                for entry in _build_embeds(title, messages)
+            ]
+            counts = [count for _, count in entries]
+            position = 0
+            # Mỗi tin nhắn Discord được tính riêng: một tin lỗi không làm các
+            # tin đã gửi bị tính là thất bại
+            for embeds in pack_messages([embed for embed, _ in entries]):
+                count = sum(counts[position:position + len(embeds)])
+                position += len(embeds)
+                if await self._send(channel_id, embeds):
+                    self.sent += count
+                else:
+                    self.failed += count
+
+    async def _send(self, channel_id: int, embeds: List[Dict[str, Any]]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            self.api_calls += 1
+            try:
+                await self.transport.send(channel_id, embeds)
+                return True
+            except RateLimited as exc:
+                self.rate_limited += 1
+                if attempt == self.max_retries:
+                    logger.error("Discord vẫn giới hạn tốc độ sau nhiều lần thử lại")
+                    return False
+                await asyncio.sleep(exc.retry_after)
+            except Exception as e:
+                logger.error(f"Lỗi khi gửi thông báo Discord: {str(e)}")
+                return False
         return False
-    except Exception as e:
-        logger.error(f"Lỗi khi gửi thông báo Discord: {str(e)}")
-        return False 
\ No newline at end of file
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "api_calls": self.api_calls,
+            "rate_limited": self.rate_limited,
+        }
+
+
+notification_dispatcher = NotificationDispatcher(
+    DiscordHTTPTransport(settings.DISCORD_BOT_TOKEN) if settings.DISCORD_BOT_TOKEN else None,
+    channel_id=settings.DISCORD_NOTIFICATION_CHANNEL_ID,
+    max_queue=settings.DISCORD_QUEUE_MAXSIZE,
+    interval=settings.DISCORD_BATCH_INTERVAL_SECONDS,
+    max_retries=settings.DISCORD_MAX_RETRIES,
+)
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional, Tuple
+
+# JSON type of the sort key for each sort column. Checked on decode so a
+# forged cursor is rejected here instead of failing in the database.
+CURSOR_KEY_TYPES: Dict[str, type] = {"id": int, "symbol": str}
+
+
+def encode_cursor(order_by: str, key: Any, id: int) -> str:
+    """
+    Encode the last row of a page as an opaque, URL-safe cursor token.
+    """
+    raw = json.dumps([order_by, key, id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, *, order_by: str) -> Optional[Tuple[Any, int]]:
+    """
+    Decode a cursor token into its (sort key, id) pair.
+
+    An empty token starts a new traversal and decodes to None. Raises ValueError
+    if the token is malformed or was issued for a different sort order.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(decoded, list) or len(decoded) != 3:
+        raise ValueError("Malformed cursor")
+    cursor_order_by, key, id = decoded
+    if cursor_order_by != order_by:
+        raise ValueError("Cursor was issued for a different sort order")
+    if not isinstance(id, int) or isinstance(id, bool):
+        raise ValueError("Malformed cursor")
+    key_type = CURSOR_KEY_TYPES.get(order_by)
+    if key_type is None or not isinstance(key, key_type) or isinstance(key, bool):
+        raise ValueError("Malformed cursor")
+    return key, id
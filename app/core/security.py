@@ -1,32 +1,126 @@
+import math
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from typing import Any, Dict, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cost option per scheme: bcrypt's rounds are a log2 work factor, the others
+# scale linearly
+COST_OPTIONS = {
+    "bcrypt": "rounds",
+    "pbkdf2_sha256": "rounds",
+    "argon2": "time_cost",
+}
+LOG2_COST_SCHEMES = {"bcrypt"}
+MAX_BCRYPT_ROUNDS = 16
+
+
+def context_options_from_settings() -> Dict[str, Any]:
+    """
+    CryptContext options from settings. The first scheme hashes new passwords;
+    the others are only verified and get rehashed on the next login.
+    """
+    schemes = list(settings.PASSWORD_HASH_SCHEMES)
+    options: Dict[str, Any] = {"schemes": schemes, "deprecated": "auto"}
+    costs = {
+        "bcrypt": settings.PASSWORD_BCRYPT_ROUNDS,
+        "pbkdf2_sha256": settings.PASSWORD_PBKDF2_ROUNDS,
+        "argon2": settings.PASSWORD_ARGON2_TIME_COST,
+    }
+    for scheme in schemes:
+        if scheme in costs:
+            set_cost(options, scheme, costs[scheme])
+    if "argon2" in schemes:
+        options["argon2__memory_cost"] = settings.PASSWORD_ARGON2_MEMORY_COST
+    return options
+
+
+def set_cost(options: Dict[str, Any], scheme: str, cost: int) -> None:
+    # Hashes below the minimum cost count as outdated and are rehashed on login
+    option = COST_OPTIONS[scheme]
+    options[f"{scheme}__{option}"] = cost
+    options[f"{scheme}__min_{option}"] = cost
+
+
+def configure_password_context(options: Dict[str, Any]) -> None:
+    """
+    Replace the module's CryptContext. Also used as the process pool
+    initializer, so worker processes hash with the same parameters.
+    """
+    global pwd_context
+    pwd_context = CryptContext(**options)
+
+
+def calibrate(options: Dict[str, Any], target_ms: float) -> Dict[str, Any]:
+    """
+    Raise the cost of the default scheme as far as it fits within `target_ms`
+    per hash on this machine. The configured cost is kept as the minimum.
+    """
+    scheme = options["schemes"][0]
+    if scheme not in COST_OPTIONS:
+        return options
+    cost = options[f"{scheme}__{COST_OPTIONS[scheme]}"]
+    # Time one hash at the configured cost, then extrapolate
+    context = CryptContext(**options)
+    start = time.perf_counter()
+    context.hash("calibration-password")
+    elapsed_ms = max((time.perf_counter() - start) * 1000, 0.001)
+    if scheme in LOG2_COST_SCHEMES:
+        target_cost = cost + int(math.floor(math.log2(target_ms / elapsed_ms)))
+        target_cost = min(target_cost, MAX_BCRYPT_ROUNDS)
+    else:
+        target_cost = int(cost * target_ms / elapsed_ms)
+    calibrated = {**options}
+    set_cost(calibrated, scheme, max(cost, target_cost))
+    return calibrated
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
+pwd_context = CryptContext(**context_options_from_settings())
 
 ALGORITHM = settings.ALGORITHM
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta | None = None) -> str:
+def _create_token(
+    subject: Union[str, Any], token_type: str, expire: datetime, version: int
+) -> str:
+    to_encode = {
+        "exp": expire,
+        "iat": datetime.now(timezone.utc),
+        "sub": str(subject),
+        # Unique id so a single token can be revoked
+        "jti": uuid.uuid4().hex,
+        "type": token_type,
+        # Must match the user's token_version; bumping it revokes all tokens
+        "ver": version,
+    }
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def create_access_token(
+    subject: Union[str, Any], expires_delta: timedelta | None = None, *, version: int = 0
+) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return _create_token(subject, "access", expire, version)
 
-def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta | None = None) -> str:
+def create_refresh_token(
+    subject: Union[str, Any], expires_delta: timedelta | None = None, *, version: int = 0
+) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return _create_token(subject, "refresh", expire, version)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
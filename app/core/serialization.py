@@ -0,0 +1,105 @@
+import importlib
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from app.schemas import PaginationParams, page_count
+from app.schemas.company import Company
+
+# Plain-dict mirror of schemas.Company. total=False lets sparse rows through;
+# keys are written in the order they appear in each dict.
+CompanyRow = TypedDict(
+    "CompanyRow",
+    {name: field.annotation for name, field in Company.model_fields.items()},
+    total=False,
+)
+
+
+class CompanyPage(TypedDict, total=False):
+    items: List[CompanyRow]
+    total: Optional[int]
+    page: int
+    page_size: int
+    pages: Optional[int]
+    next_cursor: Optional[str]
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Built once at import so requests only pay for serialization, not schema building
+company_row_adapter = TypeAdapter(CompanyRow)
+company_page_adapter = TypeAdapter(CompanyPage)
+
+
+@lru_cache(maxsize=None)
+def _msgpack():
+    # Optional (poetry install --extras encodings); JSON is served without it
+    try:
+        return importlib.import_module("msgpack")
+    except ImportError:
+        return None
+
+
+def msgpack_available() -> bool:
+    return _msgpack() is not None
+
+
+def _msgpack_default(value: Any) -> Any:
+    # Dates as ISO 8601 strings, the same as in JSON responses
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def dump_msgpack(document: Any) -> bytes:
+    return _msgpack().packb(document, default=_msgpack_default)
+
+
+def _dump_page(document: Dict[str, Any], media_type: str) -> bytes:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return dump_msgpack(document)
+    return company_page_adapter.dump_json(document)
+
+
+def render_company(row: Dict[str, Any]) -> bytes:
+    return company_row_adapter.dump_json(row)
+
+
+def render_company_page(
+    rows: Sequence[Dict[str, Any]],
+    total: Optional[int],
+    params: PaginationParams,
+    media_type: str = JSON_MEDIA_TYPE,
+) -> bytes:
+    """
+    Serialize a page of company rows straight to JSON (or MessagePack) bytes.
+
+    Produces the same document as PaginatedResponse[Company] without building
+    or validating a model per row.
+    """
+    return _dump_page(
+        {
+            "items": rows,
+            "total": total,
+            "page": params.page,
+            "page_size": params.limit,
+            "pages": page_count(total, params.limit),
+        },
+        media_type,
+    )
+
+
+def render_company_cursor_page(
+    rows: Sequence[Dict[str, Any]],
+    next_cursor: Optional[str],
+    params: PaginationParams,
+    media_type: str = JSON_MEDIA_TYPE,
+) -> bytes:
+    """Same as render_company_page, for CursorPaginatedResponse[Company]."""
+    return _dump_page(
+        {"items": rows, "page_size": params.limit, "next_cursor": next_cursor}, media_type
+    )
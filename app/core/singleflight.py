@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeout(Exception):
+    """A shared call took longer than the single-flight timeout."""
+
+
+class _Flight:
+    __slots__ = ("task", "deadline", "waiters", "timed_out")
+
+    def __init__(self, task: asyncio.Task, deadline: float) -> None:
+        self.task = task
+        self.deadline = deadline
+        self.waiters = 0
+        self.timed_out = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs `fn()` in a task of its own; callers
+    arriving while it runs wait for that task instead of calling `fn()`
+    again, and all of them get its result or exception. Since the work does
+    not belong to any one caller, a cancelled caller only stops waiting: the
+    work is cancelled once nobody is waiting for it any more.
+
+    A flight still running `timeout` seconds after it started is abandoned:
+    its waiters get SingleFlightTimeout and the next caller starts afresh,
+    so a stuck call does not hold a key hostage.
+    """
+
+    def __init__(self, *, timeout: float) -> None:
+        self.timeout = timeout
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.abandoned = 0
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def forget(self) -> None:
+        """
+        Make every call in flight unjoinable: later callers start afresh,
+        for instance because a write made the running calls' results stale.
+        Callers already waiting still get their call's result.
+        """
+        self._flights.clear()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = _Flight(task, loop.time() + self.timeout)
+            self._flights[key] = flight
+            task.add_done_callback(lambda _, flight=flight: self._forget(key, flight))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # shield: a waiter timing out or being cancelled must not cancel
+            # the task for everyone else
+            return await asyncio.wait_for(
+                asyncio.shield(flight.task), flight.deadline - loop.time()
+            )
+        except asyncio.TimeoutError:
+            if not flight.task.done():
+                # Once per flight, however many callers were waiting on it
+                if not flight.timed_out:
+                    flight.timed_out = True
+                    self.timeouts += 1
+                self._forget(key, flight)
+                raise SingleFlightTimeout(f"Shared call exceeded {self.timeout}s") from None
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,117 @@
+import codecs
+import csv
+import io
+import json
+from datetime import date
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
+
+from app.core.serialization import dump_msgpack
+
+# (line number, parsed record or None, parse error or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into UTF-8 text lines without buffering the whole body.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        if "\n" not in buffer:
+            continue
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """
+    Parse newline-delimited JSON objects, one per line. Blank lines are skipped.
+    """
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+async def iter_csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """
+    Parse CSV with a header row into dicts. Quoted fields may span lines; empty
+    cells become None. Line numbers refer to the first line of each record.
+    """
+    header: Optional[list] = None
+    pending: list = []
+    start_line = line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            start_line = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        # An odd number of quotes means a quoted field continues on the next line
+        if text.count('"') % 2:
+            continue
+        pending = []
+        if not text.strip():
+            continue
+        try:
+            row = next(csv.reader([text]))
+        except csv.Error as exc:
+            yield start_line, None, f"Invalid CSV: {exc}"
+            continue
+        if header is None:
+            header = [column.strip() for column in row]
+            continue
+        if len(row) != len(header):
+            yield start_line, None, f"Expected {len(header)} columns, got {len(row)}"
+            continue
+        yield start_line, {key: value or None for key, value in zip(header, row)}, None
+    if pending:
+        yield start_line, None, "Unterminated quoted field"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode records as newline-delimited JSON, matching the API's JSON output."""
+    return "".join(
+        json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+        + "\n"
+        for record in records
+    ).encode("utf-8")
+
+
+def encode_msgpack(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode records as a stream of MessagePack maps, one after another."""
+    return b"".join(dump_msgpack(record) for record in records)
+
+
+def encode_csv(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Encode rows as CSV lines; None becomes an empty cell, dates ISO 8601."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(
+        ["" if value is None else value.isoformat() if isinstance(value, date) else value
+         for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
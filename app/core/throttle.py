@@ -0,0 +1,170 @@
+import importlib
+import time
+from typing import Any, Callable, Dict, Optional, Protocol
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class ThrottleStore(Protocol):
+    """
+    Where failure counters live. The in-memory store is per worker; a shared
+    store (e.g. Redis) lets all workers see the same counters. Implementations
+    must apply `hit` atomically per key.
+    """
+
+    async def retry_after(self, key: str) -> float:
+        """Seconds until `key` may try again, 0 if it is not locked out."""
+
+    async def hit(
+        self, key: str, *, limit: int, window: float, lockout: float, max_lockout: float
+    ) -> float:
+        """
+        Record a failure. Returns the lockout in seconds if this failure pushed
+        `key` over `limit` failures per sliding `window`, else 0.
+        """
+
+    async def reset(self, key: str) -> None:
+        """Forget the failures and lockout history of `key`."""
+
+
+class _Counter:
+    __slots__ = ("window_start", "previous", "current", "strikes", "locked_until")
+
+    def __init__(self, now: float) -> None:
+        self.window_start = now
+        self.previous = 0
+        self.current = 0
+        self.strikes = 0
+        self.locked_until = 0.0
+
+
+class MemoryThrottleStore:
+    """
+    Per-worker store using sliding-window counters: the count of the previous
+    fixed window is weighted by how much of it still overlaps the sliding
+    window, so each key needs a few numbers instead of a list of timestamps.
+
+    Keys idle for `ttl` seconds are forgotten and at most `maxsize` keys are
+    kept (least recently used go first), so a flood of random usernames or
+    addresses cannot grow memory without bound.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._timer = timer
+        self.counters: TTLCache[str, _Counter] = TTLCache(
+            maxsize=settings.LOGIN_THROTTLE_MAXSIZE if maxsize is None else maxsize,
+            ttl=settings.LOGIN_THROTTLE_FORGET_SECONDS if ttl is None else ttl,
+            timer=timer,
+        )
+
+    async def retry_after(self, key: str) -> float:
+        counter = self.counters.get(key)
+        if counter is None:
+            return 0.0
+        return max(0.0, counter.locked_until - self._timer())
+
+    async def hit(
+        self, key: str, *, limit: int, window: float, lockout: float, max_lockout: float
+    ) -> float:
+        now = self._timer()
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = _Counter(now)
+        elapsed = now - counter.window_start
+        if elapsed >= 2 * window:
+            counter.window_start, counter.previous, counter.current = now, 0, 0
+        elif elapsed >= window:
+            counter.window_start += window
+            counter.previous, counter.current = counter.current, 0
+        counter.current += 1
+        overlap = 1 - (now - counter.window_start) / window
+        failures = counter.previous * overlap + counter.current
+
+        locked_for = 0.0
+        if failures > limit:
+            # Each lockout in a row doubles the previous one
+            counter.strikes += 1
+            locked_for = min(lockout * 2 ** (counter.strikes - 1), max_lockout)
+            counter.locked_until = now + locked_for
+            counter.previous = counter.current = 0
+        # Writing back refreshes the idle timeout
+        self.counters.set(key, counter)
+        return locked_for
+
+    async def reset(self, key: str) -> None:
+        self.counters.pop(key)
+
+
+def load_store(path: str) -> ThrottleStore:
+    """Instantiate a store from a dotted path like `package.module.ClassName`."""
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class LoginThrottle:
+    """
+    Limits failed logins per account and per client address.
+
+    `check` runs before any user lookup or password hashing, so a locked-out
+    client costs a dictionary lookup instead of a bcrypt verify.
+    """
+
+    def __init__(self, store: ThrottleStore) -> None:
+        self.store = store
+        self.rejected = 0
+        self.lockouts = 0
+
+    @staticmethod
+    def _keys(ip: str, account: str) -> Dict[str, int]:
+        return {
+            f"ip:{ip}": settings.LOGIN_THROTTLE_IP_LIMIT,
+            f"account:{account.strip().lower()}": settings.LOGIN_THROTTLE_ACCOUNT_LIMIT,
+        }
+
+    async def check(self, ip: str, account: str) -> float:
+        """Seconds the client must wait before trying again, 0 if allowed."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return 0.0
+        retry_after = 0.0
+        for key in self._keys(ip, account):
+            retry_after = max(retry_after, await self.store.retry_after(key))
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    async def failure(self, ip: str, account: str) -> None:
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        for key, limit in self._keys(ip, account).items():
+            locked_for = await self.store.hit(
+                key,
+                limit=limit,
+                window=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+                lockout=settings.LOGIN_THROTTLE_LOCKOUT_SECONDS,
+                max_lockout=settings.LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS,
+            )
+            if locked_for:
+                self.lockouts += 1
+
+    async def success(self, ip: str, account: str) -> None:
+        # Only the account is cleared: one valid login must not reset the
+        # counter of an address that is guessing passwords for other accounts
+        if settings.LOGIN_THROTTLE_ENABLED:
+            await self.store.reset(f"account:{account.strip().lower()}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"rejected": self.rejected, "lockouts": self.lockouts}
+        counters = getattr(self.store, "counters", None)
+        if counters is not None:
+            stats["tracked_keys"] = len(counters)
+        return stats
+
+
+login_throttle = LoginThrottle(load_store(settings.LOGIN_THROTTLE_STORE))
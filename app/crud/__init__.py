@@ -1,3 +1,3 @@
 from .crud_user import user
 from .crud_company import company
-
+from .crud_token import revoked_token
@@ -1,60 +1,378 @@
-from typing import Any, Dict, List, Optional, Union, Tuple
+import json
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from sqlalchemy import or_, func
+from pydantic import ValidationError
+from sqlalchemy import Row, case, func, literal_column, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.cache import TTLCache
+from app.core.changefeed import company_feed
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.core.streaming import Record
+from app.db.invalidation import invalidation_bus
 from app.models.company import Company
-from app.schemas.company import CompanyCreate, CompanyUpdate
+from app.models.table_watermark import TableWatermark
+from app.schemas.company import (
+    Company as CompanySchema,
+    CompanyCreate,
+    CompanyImportError,
+    CompanyImportResult,
+    CompanyUpdate,
+)
+
+
+# Columns the list endpoints may sort by. Both are unique, so together with the
+# id tie-breaker they give a stable total order for keyset pagination.
+ORDERABLE_COLUMNS = {"id": Company.id, "symbol": Company.symbol}
+
+T = TypeVar("T")
+
+# Fields of create/update events on the change feed: the API's company document
+EVENT_FIELDS = tuple(CompanySchema.model_fields)
+
+
+def _normalize_search(search: str) -> str:
+    return " ".join(search.split())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fold(value: Any):
+    # Same folding as Company.search_document, applied to the user's input.
+    return func.lower(func.f_unaccent(value))
+
+
+async def _estimate_rows(db: AsyncSession, query) -> Optional[int]:
+    """Row count the planner expects `query` to return, without running it."""
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 
 class CRUDCompany:
-    async def get(self, db: AsyncSession, *, id: int) -> Optional[Company]:
-        result = await db.execute(select(Company).filter(Company.id == id))
-        return result.scalars().first()
+    def __init__(self) -> None:
+        # Exact totals keyed by the engine that counted them (primary or
+        # replica) and normalized search term ("" for no search), so a lagging
+        # replica's total is never served to a reader pinned to the primary.
+        # Any write clears it, in other workers via the invalidation bus.
+        self.count_cache: TTLCache[Tuple[Any, str], int] = TTLCache(
+            maxsize=settings.COMPANY_COUNT_CACHE_MAXSIZE,
+            ttl=settings.COMPANY_COUNT_CACHE_TTL_SECONDS,
+        )
+        invalidation_bus.register("company", self.invalidate)
+        # Concurrent identical reads (a hot symbol, a popular search) share one query
+        self.read_flight = SingleFlight(timeout=settings.COMPANY_READ_COALESCE_TIMEOUT_SECONDS)
 
-    async def get_by_symbol(self, db: AsyncSession, *, symbol: str) -> Optional[Company]:
-        result = await db.execute(select(Company).filter(Company.symbol == symbol))
-        return result.scalars().first()
+    def invalidate(self, ids: Optional[List[str]] = None) -> None:
+        # Any company write can change the total of any search
+        self.count_cache.clear()
+        # Reads that started before the write may return the old rows, so
+        # nobody reading after it may join them
+        self.read_flight.forget()
+
+    async def _coalesced(
+        self, db: AsyncSession, key: Tuple[Any, ...], read: Callable[[AsyncSession], Awaitable[T]]
+    ) -> T:
+        """
+        Run `read(session)` once for all concurrent calls with the same key.
+
+        The shared read gets a session of its own, so a caller that goes away
+        cannot close it under the others; `db` only picks the database
+        (primary or replica). Callers share the result, so it must be plain
+        data they copy before changing.
+        """
+        if not settings.COMPANY_READ_COALESCING:
+            return await read(db)
+        bind = db.bind
+
+        async def run() -> T:
+            async with AsyncSession(bind=bind, autoflush=False) as session:
+                return await read(session)
+
+        return await self.read_flight.do((bind, *key), run)
+
+    async def _get_row(
+        self, db: AsyncSession, key: Tuple[Any, ...], condition, columns: Optional[Sequence[str]]
+    ) -> Optional[Union[Company, Dict[str, Any]]]:
+        query = self._select(columns).filter(condition)
+        if columns is None:
+            # ORM instances belong to the caller's session and are never shared
+            rows = await self._fetch(db, query, None)
+            return rows[0] if rows else None
+        rows = await self._coalesced(
+            db, (*key, tuple(columns)), lambda session: self._fetch(session, query, columns)
+        )
+        return dict(rows[0]) if rows else None
+
+    async def get(
+        self, db: AsyncSession, *, id: int, columns: Optional[Sequence[str]] = None
+    ) -> Optional[Union[Company, Dict[str, Any]]]:
+        return await self._get_row(db, ("id", id), Company.id == id, columns)
+
+    async def get_by_symbol(
+        self, db: AsyncSession, *, symbol: str, columns: Optional[Sequence[str]] = None
+    ) -> Optional[Union[Company, Dict[str, Any]]]:
+        return await self._get_row(db, ("symbol", symbol), Company.symbol == symbol, columns)
     
+    @staticmethod
+    def _event_row(db_obj: Company) -> Dict[str, Any]:
+        return {name: getattr(db_obj, name) for name in EVENT_FIELDS}
+
+    async def get_watermark(self, db: AsyncSession) -> Optional[Tuple[int, datetime]]:
+        """
+        Change counter and time of the last write to the companies table, or
+        None if the watermark row is missing.
+        """
+        query = select(TableWatermark.version, TableWatermark.updated_at).filter(
+            TableWatermark.table_name == Company.__tablename__
+        )
+
+        async def read(session: AsyncSession) -> Optional[Tuple[int, datetime]]:
+            row = (await session.execute(query)).first()
+            return (row.version, row.updated_at) if row else None
+
+        return await self._coalesced(db, ("watermark",), read)
+
     async def get_by_organ_code(self, db: AsyncSession, *, organ_code: str) -> Optional[Company]:
         result = await db.execute(select(Company).filter(Company.organ_code == organ_code))
         return result.scalars().first()
 
-    async def get_multi(
-        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, search: Optional[str] = None
-    ) -> Tuple[List[Company], int]:
-        query = select(Company)
-        
-        # Apply search filter if provided
+    async def get_multi_by_symbols(
+        self, db: AsyncSession, *, symbols: Sequence[str]
+    ) -> List[Company]:
+        result = await db.execute(select(Company).filter(Company.symbol.in_(symbols)))
+        return result.scalars().all()
+
+    async def get_multi_by_ids(self, db: AsyncSession, *, ids: Sequence[int]) -> List[Company]:
+        result = await db.execute(select(Company).filter(Company.id.in_(ids)))
+        return result.scalars().all()
+
+    def _apply_search(self, query, search: Optional[str]):
+        """
+        Require every word of `search` to appear in the accent-folded search
+        document. Each predicate is served by the trigram GIN index, so
+        "ngan hang" matches "Ngân hàng" without a sequential scan.
+        """
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Company.symbol.ilike(search_term),
-                    Company.organ_code.ilike(search_term),
-                    Company.organ_short_name.ilike(search_term),
-                    Company.organ_name.ilike(search_term)
+            for word in search.split():
+                pattern = _fold(f"%{_escape_like(word)}%")
+                query = query.filter(Company.search_document.like(pattern, escape="\\"))
+        return query
+
+    def _relevance_order(self, search: str):
+        """
+        Order search hits by relevance: an exact symbol match first, then
+        symbol prefix matches, then by trigram word similarity.
+        """
+        return (
+            case(
+                (func.upper(Company.symbol) == search.upper(), 0),
+                (func.upper(Company.symbol).startswith(search.upper(), autoescape=True), 1),
+                else_=2,
+            ),
+            func.word_similarity(_fold(search), Company.search_document).desc(),
+            Company.symbol,
+            Company.id,
+        )
+
+    async def count(
+        self, db: AsyncSession, *, search: Optional[str] = None, mode: str = "exact"
+    ) -> Optional[int]:
+        """
+        Count companies matching `search`.
+
+        `exact` counts are cached per database and normalized search term,
+        `estimate` reads planner statistics and `none` skips counting and
+        returns None.
+        """
+        if mode == "none":
+            return None
+        search = _normalize_search(search or "") or None
+        
+        if mode == "estimate":
+            if search is None:
+                result = await db.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'companies'::regclass")
                 )
-            )
+                estimate = result.scalar()
+                # reltuples is -1 until the table has been vacuumed or analyzed
+                if estimate is not None and estimate >= 0:
+                    return estimate
+            else:
+                return await _estimate_rows(db, self._apply_search(select(Company.id), search))
         
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await db.execute(count_query)
-        total_count = total.scalar()
+        cache_key = (db.bind, search.lower() if search else "")
+        total_count = self.count_cache.get(cache_key)
+        if total_count is None:
+            generation = self.count_cache.generation
+            query = self._apply_search(select(Company.id), search)
+            total = await db.execute(
+                select(func.count())
+                .select_from(query.subquery())
+                .execution_options(explain_slow=True)
+            )
+            total_count = total.scalar()
+            self.count_cache.set(cache_key, total_count, generation=generation)
+        return total_count
+
+    def _select(self, columns: Optional[Sequence[str]]):
+        if columns is None:
+            return select(Company)
+        return select(*(getattr(Company, name) for name in columns))
+
+    async def _fetch(
+        self, db: AsyncSession, query, columns: Optional[Sequence[str]]
+    ) -> List[Union[Company, Dict[str, Any]]]:
+        # Plain reads, safe for the slow query log to EXPLAIN ANALYZE
+        result = await db.execute(query.execution_options(explain_slow=True))
+        if columns is None:
+            return result.scalars().all()
+        # Plain dicts straight from the result tuples, no ORM identity map
+        return [dict(zip(columns, row)) for row in result]
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        search: Optional[str] = None,
+        order_by: Optional[str] = None,
+        count: str = "exact",
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Union[Company, Dict[str, Any]]], Optional[int]]:
+        """
+        Offset pagination. Returns Company objects, or dicts of `columns` when
+        given, together with the total computed according to `count`.
+        Concurrent identical requests for dicts share one pair of queries.
+        """
+        search = _normalize_search(search or "") or None
+        query = self._apply_search(self._select(columns), search)
         
-        # Apply pagination
+        # Apply ordering and pagination; searches are ranked unless a sort is requested
+        if search and order_by is None:
+            query = query.order_by(*self._relevance_order(search))
+        else:
+            query = query.order_by(ORDERABLE_COLUMNS[order_by or "id"], Company.id)
         query = query.offset(skip).limit(limit)
+
+        async def read(session: AsyncSession):
+            total_count = await self.count(session, search=search, mode=count)
+            return await self._fetch(session, query, columns), total_count
+
+        if columns is None:
+            return await read(db)
+        key = ("page", skip, limit, search, order_by, count, tuple(columns))
+        rows, total_count = await self._coalesced(db, key, read)
+        return [dict(row) for row in rows], total_count
+
+    async def get_multi_by_cursor(
+        self,
+        db: AsyncSession,
+        *,
+        after: Optional[Tuple[Any, int]] = None,
+        limit: int = 100,
+        search: Optional[str] = None,
+        order_by: str = "id",
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Union[Company, Dict[str, Any]]], Optional[Tuple[Any, int]]]:
+        """
+        Keyset pagination: return up to `limit` companies that sort after the
+        `after` (sort key, id) pair, plus the key of the last row if more remain.
+
+        The seek predicate is served by the index on the sort column, so every
+        page costs the same no matter how deep into the table it is.
+        """
+        sort_column = ORDERABLE_COLUMNS[order_by]
+        search = _normalize_search(search or "") or None
+        # The cursor needs the sort key and id even if the caller didn't ask for them
+        extra_columns = []
+        select_columns = columns
+        if columns is not None:
+            extra_columns = [
+                name for name in dict.fromkeys((order_by, "id")) if name not in columns
+            ]
+            select_columns = list(columns) + extra_columns
+        query = self._apply_search(self._select(select_columns), search)
+        if after is not None:
+            key, last_id = after
+            if order_by == "id":
+                query = query.filter(Company.id > last_id)
+            else:
+                query = query.filter(tuple_(sort_column, Company.id) > tuple_(key, last_id))
         
-        # Execute query
-        result = await db.execute(query)
-        return result.scalars().all(), total_count
+        # Fetch one extra row to find out whether another page exists
+        query = query.order_by(sort_column, Company.id).limit(limit + 1)
+        companies = await self._fetch(db, query, select_columns)
+        
+        next_key = None
+        if len(companies) > limit:
+            companies = companies[:limit]
+            last = companies[-1]
+            if columns is None:
+                next_key = (getattr(last, order_by), last.id)
+            else:
+                next_key = (last[order_by], last["id"])
+        if extra_columns:
+            companies = [{name: row[name] for name in columns} for row in companies]
+        return companies, next_key
+
+    async def stream_rows(
+        self,
+        db: AsyncSession,
+        *,
+        columns: Sequence[str],
+        updated_since: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream the selected columns of every company, ordered by id, in batches
+        of `batch_size` rows read through a server-side cursor.
+        """
+        query = select(*(getattr(Company, name) for name in columns))
+        if updated_since is not None:
+            query = query.filter(Company.update_date >= updated_since)
+        query = query.order_by(Company.id).execution_options(yield_per=batch_size)
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
 
     async def create(self, db: AsyncSession, *, obj_in: CompanyCreate) -> Company:
         db_obj = Company(**obj_in.model_dump())
         db.add(db_obj)
+        await db.flush()
+        await invalidation_bus.notify(db, "company", [db_obj.id])
         await db.commit()
+        self.invalidate()
         await db.refresh(db_obj)
+        company_feed.publish("create", self._event_row(db_obj))
         return db_obj
 
     async def update(
@@ -68,15 +386,133 @@ class CRUDCompany:
         for field, value in update_data.items():
             setattr(db_obj, field, value)
         
+        await invalidation_bus.notify(db, "company", [db_obj.id])
         await db.commit()
+        self.invalidate()
         await db.refresh(db_obj)
+        company_feed.publish("update", self._event_row(db_obj))
         return db_obj
 
+    async def upsert_many(
+        self, db: AsyncSession, *, objs_in: List[CompanyCreate]
+    ) -> Tuple[int, int]:
+        """
+        Insert or update companies by symbol in one INSERT ... ON CONFLICT
+        statement and commit. Rows identical to the stored ones are left
+        alone. Returns (inserted, updated) counts.
+        """
+        # ON CONFLICT cannot touch the same row twice, so the last row per symbol wins
+        by_symbol = {obj.symbol: obj for obj in objs_in}
+        now = datetime.utcnow()
+        rows = [
+            {**obj.model_dump(), "create_date": now, "update_date": now}
+            for obj in by_symbol.values()
+        ]
+        stmt = pg_insert(Company).values(rows)
+        compared_columns = [name for name in CompanyCreate.model_fields if name != "symbol"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Company.symbol],
+            set_={name: stmt.excluded[name] for name in compared_columns + ["update_date"]},
+            # Unchanged rows are neither rewritten nor returned, so they do
+            # not bump update_date or reach the change feed
+            where=tuple_(*(getattr(Company, name) for name in compared_columns)).is_distinct_from(
+                tuple_(*(stmt.excluded[name] for name in compared_columns))
+            ),
+        ).returning(literal_column("(xmax = 0)"), Company.id, Company.symbol)
+        
+        result = await db.execute(stmt)
+        returned = result.all()
+        if not returned:
+            await db.commit()
+            return 0, 0
+        await invalidation_bus.notify(db, "company", [row[1] for row in returned])
+        await db.commit()
+        self.invalidate()
+        created, updated = [], []
+        for is_insert, id, symbol in returned:
+            (created if is_insert else updated).append({"id": id, "symbol": symbol})
+        company_feed.publish_bulk(created, updated)
+        return len(created), len(updated)
+
+    async def import_records(
+        self,
+        db: AsyncSession,
+        *,
+        records: AsyncIterable[Record],
+        batch_size: int,
+        max_errors: int,
+    ) -> CompanyImportResult:
+        """
+        Validate streamed rows against CompanyCreate and upsert them in batches,
+        so only one batch is held in memory at a time.
+
+        A batch rejected by the database (e.g. an organ_code owned by another
+        symbol) is retried row by row to pinpoint the offending rows.
+        """
+        result = CompanyImportResult(received=0, inserted=0, updated=0, failed=0)
+
+        def reject(line: int, symbol: Optional[str], errors: List[str]) -> None:
+            result.failed += 1
+            if len(result.errors) < max_errors:
+                result.errors.append(CompanyImportError(line=line, symbol=symbol, errors=errors))
+            else:
+                result.errors_truncated = True
+
+        async def flush(batch: List[Tuple[int, CompanyCreate]]) -> None:
+            try:
+                inserted, updated = await self.upsert_many(db, objs_in=[obj for _, obj in batch])
+            except IntegrityError:
+                await db.rollback()
+            else:
+                result.inserted += inserted
+                result.updated += updated
+                return
+            for line, obj in batch:
+                try:
+                    inserted, updated = await self.upsert_many(db, objs_in=[obj])
+                except IntegrityError as exc:
+                    await db.rollback()
+                    reject(line, obj.symbol, [str(exc.orig).splitlines()[0]])
+                else:
+                    result.inserted += inserted
+                    result.updated += updated
+
+        batch: List[Tuple[int, CompanyCreate]] = []
+        async for line, record, error in records:
+            result.received += 1
+            if error is not None:
+                reject(line, None, [error])
+                continue
+            try:
+                obj = CompanyCreate.model_validate(record)
+            except ValidationError as exc:
+                reject(
+                    line,
+                    record.get("symbol") if isinstance(record.get("symbol"), str) else None,
+                    [
+                        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                        for err in exc.errors()
+                    ],
+                )
+                continue
+            batch.append((line, obj))
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+        return result
+
     async def delete(self, db: AsyncSession, *, id: int) -> Optional[Company]:
         company = await self.get(db, id=id)
         if company:
+            # Read before the commit expires the instance
+            event_row = {"id": company.id, "symbol": company.symbol}
             await db.delete(company)
+            await invalidation_bus.notify(db, "company", [company.id])
             await db.commit()
+            self.invalidate()
+            company_feed.publish("delete", event_row)
         return company
 
 
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Re-read rows revoked slightly before the last sync, in case they committed late
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class CRUDRevokedToken:
+    """
+    Revoked token ids, answered from an in-memory Bloom filter.
+
+    A token absent from the filter is certainly not revoked, which is the
+    common case and costs one hash. A hit, possibly a false positive, is
+    confirmed against the database. Revocations made by other workers reach
+    the filter on the next periodic sync; until the first sync succeeds
+    every check goes to the database.
+    """
+
+    def __init__(self) -> None:
+        self.filter = BloomFilter(
+            capacity=settings.TOKEN_REVOCATION_FILTER_CAPACITY,
+            error_rate=settings.TOKEN_REVOCATION_FILTER_ERROR_RATE,
+        )
+        self.synced_at: Optional[datetime] = None
+        self.checks = 0
+        self.db_checks = 0
+        self.false_positives = 0
+        self._task: Optional[asyncio.Task] = None
+        # Tokens revoked by this worker while the filter is being rebuilt
+        self._revoked_during_rebuild: Optional[List[str]] = None
+
+    async def is_revoked(self, db: AsyncSession, *, jti: str) -> bool:
+        self.checks += 1
+        if self.synced_at is not None and jti not in self.filter:
+            return False
+        self.db_checks += 1
+        result = await db.execute(select(RevokedToken.jti).filter(RevokedToken.jti == jti))
+        revoked = result.first() is not None
+        if not revoked and self.synced_at is not None:
+            self.false_positives += 1
+        return revoked
+
+    async def revoke(
+        self, db: AsyncSession, *, jti: str, user_id: UUID, expires_at: datetime
+    ) -> bool:
+        """
+        Revoke a token and commit. Returns False if it was already revoked,
+        which makes this safe to use for single-use refresh tokens.
+        """
+        stmt = (
+            pg_insert(RevokedToken)
+            .values(jti=jti, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.jti)
+        )
+        result = await db.execute(stmt)
+        inserted = result.first() is not None
+        await db.commit()
+        self.filter.add(jti)
+        if self._revoked_during_rebuild is not None:
+            self._revoked_during_rebuild.append(jti)
+        return inserted
+
+    async def sync(self, db: AsyncSession) -> None:
+        """
+        Add tokens revoked since the last sync to the filter. The first sync,
+        or one that finds the filter over capacity, rebuilds it from scratch
+        and purges expired rows.
+        """
+        now = (await db.execute(select(func.now()))).scalar()
+        rebuild = self.synced_at is None or self.filter.count > self.filter.capacity
+        if rebuild:
+            self._revoked_during_rebuild = []
+        try:
+            if rebuild:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+                await db.commit()
+                live = (await db.execute(select(func.count()).select_from(RevokedToken))).scalar()
+                target = BloomFilter(
+                    capacity=max(settings.TOKEN_REVOCATION_FILTER_CAPACITY, live * 2),
+                    error_rate=settings.TOKEN_REVOCATION_FILTER_ERROR_RATE,
+                )
+                query = select(RevokedToken.jti)
+            else:
+                target = self.filter
+                query = select(RevokedToken.jti).filter(
+                    RevokedToken.revoked_at >= self.synced_at - SYNC_OVERLAP
+                )
+            result = await db.stream_scalars(query.execution_options(yield_per=10_000))
+            async for jti in result:
+                target.add(jti)
+            if rebuild:
+                # Tokens revoked locally while rebuilding may be missing from the query
+                for jti in self._revoked_during_rebuild:
+                    target.add(jti)
+                self.filter = target
+        finally:
+            self._revoked_during_rebuild = None
+        self.synced_at = now
+
+    async def _sync_forever(self, session_factory: async_sessionmaker) -> None:
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.sync(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token revocation sync failed: {str(e)}")
+            await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_SECONDS)
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._sync_forever(session_factory), name="token-revocation-sync"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "synced": self.synced_at is not None,
+            "filter_items": self.filter.count,
+            "filter_capacity": self.filter.capacity,
+            "checks": self.checks,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+        }
+
+
+revoked_token = CRUDRevokedToken()
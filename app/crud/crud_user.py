@@ -1,18 +1,56 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
+from uuid import UUID
 
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.db.invalidation import invalidation_bus
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
 
 class CRUDUser:
+    def __init__(self) -> None:
+        # Detached snapshots of recently authenticated users, keyed by id
+        self.principal_cache: TTLCache[UUID, User] = TTLCache(
+            maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+        )
+        invalidation_bus.register("user", self._evict)
+
     async def get(self, db: AsyncSession, *, id: int) -> Optional[User]:
         result = await db.execute(select(User).filter(User.id == id))
         return result.scalars().first()
 
+    async def get_principal(self, db: AsyncSession, *, id: UUID) -> Optional[User]:
+        """
+        Load the user behind an access token, served from the principal cache
+        when possible. The returned instance is attached to `db` either way.
+        """
+        cached = self.principal_cache.get(id)
+        if cached is None:
+            generation = self.principal_cache.generation
+            cached = await self.get(db, id=id)
+            if cached is None:
+                return None
+            # Keep a detached copy so later commits in this session can't expire it
+            db.expunge(cached)
+            self.principal_cache.set(id, cached, generation=generation)
+        return await db.merge(cached, load=False)
+
+    def invalidate(self, id: UUID) -> None:
+        self.principal_cache.pop(id)
+
+    def _evict(self, ids: Optional[List[str]]) -> None:
+        if ids is None:
+            self.principal_cache.clear()
+            return
+        for id in ids:
+            self.invalidate(UUID(id))
+
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
         result = await db.execute(select(User).filter(User.email == email))
         return result.scalars().first()
@@ -22,7 +60,7 @@ class CRUDUser:
             email=obj_in.email,
             full_name=obj_in.full_name,
             phone=obj_in.phone,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await password_hasher.hash(obj_in.password),
         )
         db.add(db_obj)
         await db.commit()
@@ -35,8 +73,29 @@ class CRUDUser:
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(exclude_unset=True)
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+            update_data = obj_in.model_dump(exclude_unset=True)
+        
+        user_id = db_obj.id
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        
+        await invalidation_bus.notify(db, "user", [user_id])
+        await db.commit()
+        self.invalidate(user_id)
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def deactivate(self, db: AsyncSession, *, db_obj: User) -> User:
+        return await self.update(db, db_obj=db_obj, obj_in={"is_active": False})
+
+    async def revoke_all_tokens(self, db: AsyncSession, *, id: UUID) -> None:
+        """Invalidate every access and refresh token issued to the user so far."""
+        await db.execute(
+            update(User).where(User.id == id).values(token_version=User.token_version + 1)
+        )
+        await invalidation_bus.notify(db, "user", [id])
+        await db.commit()
+        self.invalidate(id)
 
     async def authenticate(
         self, db: AsyncSession, *, email: str, password: str
@@ -44,8 +103,13 @@ class CRUDUser:
         user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
+        # Upgrade hashes made with an old scheme or a lower cost while we have the password
+        if password_hasher.needs_update(user.hashed_password):
+            user = await self.update(
+                db, db_obj=user, obj_in={"hashed_password": await password_hasher.hash(password)}
+            )
         return user
 
 
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import secrets
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Keys per notification; beyond this the whole kind is invalidated, keeping
+# the payload well under Postgres' 8000 byte NOTIFY limit
+MAX_KEYS = 100
+
+# Shown in pg_stat_activity for the listening connections
+APPLICATION_NAME = "iqx-cache-invalidation"
+
+# Ceiling of the listener's reconnect backoff, in seconds
+MAX_RECONNECT_DELAY = 30.0
+
+# evict(keys) drops those entries from a local cache, evict(None) everything
+Evict = Callable[[Optional[List[str]]], None]
+
+
+class InvalidationBus:
+    """
+    Evicts in-process cache entries in every worker when a write commits.
+
+    Writers call `notify` inside their transaction, so the message goes out
+    on commit and never for a rollback. Each worker holds one dedicated
+    connection that LISTENs on the channel and evicts the named keys from
+    the caches registered for that kind. Messages sent while the listener is
+    disconnected are lost, so every (re)connect flushes all registered caches
+    once LISTEN is in place; until then TTLs bound how stale entries get.
+    """
+
+    def __init__(self) -> None:
+        self.origin = secrets.token_hex(4)
+        self._handlers: Dict[str, List[Evict]] = {}
+        self.connected = False
+        self.sent = 0
+        self.received = 0
+        self.connects = 0
+        self.flushes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CACHE_INVALIDATION_ENABLED
+
+    def register(self, kind: str, evict: Evict) -> None:
+        self._handlers.setdefault(kind, []).append(evict)
+
+    async def notify(
+        self, db: Union[AsyncSession, AsyncConnection], kind: str, keys: Optional[Iterable[Any]]
+    ) -> None:
+        """
+        Queue an invalidation of `keys` (None for all) of `kind` in the
+        current transaction of `db`. Other workers evict them on commit.
+        """
+        if not self.enabled:
+            return
+        key_list = None if keys is None else [str(key) for key in keys]
+        if key_list is not None and len(key_list) > MAX_KEYS:
+            key_list = None
+        payload = json.dumps({"origin": self.origin, "kind": kind, "keys": key_list})
+        await db.execute(select(func.pg_notify(settings.CACHE_INVALIDATION_CHANNEL, payload)))
+        self.sent += 1
+
+    def handle(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            origin, kind, keys = message["origin"], message["kind"], message["keys"]
+        except (ValueError, TypeError, KeyError):
+            logger.warning(f"Ignoring malformed cache invalidation: {payload!r}")
+            return
+        # The writing worker evicted its own entries after committing
+        if origin == self.origin:
+            return
+        self.received += 1
+        for evict in self._handlers.get(kind, ()):
+            evict(keys)
+
+    def flush(self) -> None:
+        self.flushes += 1
+        for handlers in self._handlers.values():
+            for evict in handlers:
+                evict(None)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.handle(payload)
+
+    def _dsn(self) -> str:
+        if settings.CACHE_INVALIDATION_DSN:
+            return settings.CACHE_INVALIDATION_DSN
+        # asyncpg takes a plain libpq URL, without SQLAlchemy's driver suffix
+        url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return url.render_as_string(hide_password=False)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(
+            self._dsn(), server_settings={"application_name": APPLICATION_NAME}
+        )
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            await connection.add_listener(
+                settings.CACHE_INVALIDATION_CHANNEL, self._on_notification
+            )
+            self.connected = True
+            self.connects += 1
+            # Anything written while nobody was listening has to be reloaded
+            self.flush()
+            # Notifications arrive on their own. A closed socket ends the wait
+            # at once; the ping catches connections that died silently.
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(
+                        closed.wait(), settings.CACHE_INVALIDATION_PING_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    await connection.execute(
+                        "SELECT 1", timeout=settings.CACHE_INVALIDATION_PING_SECONDS
+                    )
+            raise ConnectionError("connection closed")
+        finally:
+            self.connected = False
+            connection.terminate()
+
+    async def _listen_forever(self) -> None:
+        delay = settings.CACHE_INVALIDATION_RECONNECT_SECONDS
+        while True:
+            connects = self.connects
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener disconnected: {str(e)}")
+            if self.connects != connects:
+                # An established connection was lost: start backing off from scratch
+                delay = settings.CACHE_INVALIDATION_RECONNECT_SECONDS
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._listen_forever(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "connected": self.connected,
+            "connects": self.connects,
+            "flushes": self.flushes,
+            "sent": self.sent,
+            "received": self.received,
+        }
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,48 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Histogram
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long checkouts take and how many
+    time out, so pool sizing can be judged from live numbers.
+
+    Checkout time covers waiting for a free connection, opening a new one and
+    the pre-ping round trip when pool_pre_ping is enabled.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_seconds = Histogram()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        self.checkouts += 1
+        self.checkout_seconds.observe(time.perf_counter() - start)
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            # Negative while the pool has not yet opened `size` connections
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_seconds": self.checkout_seconds.snapshot(),
+        }
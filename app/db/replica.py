@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.invalidation import invalidation_bus
+from app.db.session import ReplicaSessionLocal, SessionLocal, get_engine, get_replica_engine
+
+logger = logging.getLogger(__name__)
+
+# request.state attribute naming the authenticated user of a request, read by
+# ReadYourWritesMiddleware to keep that user's reads on the primary after a write
+WRITER_STATE_KEY = "authenticated_subject"
+# request.state flag set by routes writing data that is read from the replica;
+# only their writes keep the client's reads on the primary
+READS_OWN_WRITES_STATE_KEY = "reads_own_writes"
+
+# Seconds since the last replayed transaction, or 0 when the standby has
+# replayed everything it received (an idle primary writes no new WAL).
+# A server that is not in recovery is its own "replica" and never lags.
+LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine for read-only sessions.
+
+    Reads go to the replica unless the client wrote within the sticky window
+    (see ReadYourWritesMiddleware), or the last lag check found the replica
+    too far behind or unreachable. Until the first lag check succeeds every
+    read goes to the primary.
+
+    A client is recognized as a recent writer by its cookie or, for bearer
+    token clients that keep no cookies, by the user it authenticated as.
+    Users who wrote are remembered per worker and, when cache invalidation
+    is enabled, announced to the other workers through the same channel.
+    """
+
+    def __init__(self) -> None:
+        self.lag_seconds: Optional[float] = None
+        self.writers: TTLCache[str, bool] = TTLCache(
+            maxsize=settings.DB_REPLICA_STICKY_MAXSIZE, ttl=settings.DB_REPLICA_STICKY_SECONDS
+        )
+        self.replica_reads = 0
+        self.sticky_reads = 0
+        self.lagging_reads = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.DATABASE_REPLICA_URL)
+
+    def replica_current(self) -> bool:
+        if not settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            return True
+        return (
+            self.lag_seconds is not None
+            and self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        )
+
+    def remember_writers(self, subjects: Optional[List[str]]) -> None:
+        # A flush of the invalidation bus (None) carries no writer to remember
+        for subject in subjects or ():
+            self.writers.set(subject, True, ttl=settings.DB_REPLICA_STICKY_SECONDS)
+
+    async def mark_written(self, subject: str) -> None:
+        """Keep `subject`'s reads on the primary for the sticky window, in every worker."""
+        self.remember_writers([subject])
+        if not invalidation_bus.enabled:
+            return
+        try:
+            async with get_engine().begin() as conn:
+                await invalidation_bus.notify(conn, "writer", [subject])
+        except Exception as e:
+            logger.error(f"Could not announce a recent writer to other workers: {str(e)}")
+
+    def is_recent_writer(self, subject: Optional[str]) -> bool:
+        return subject is not None and len(self.writers) > 0 and bool(self.writers.get(subject))
+
+    def use_replica(self, sticky_until: Optional[str], subject: Optional[str] = None) -> bool:
+        """
+        `sticky_until` is the client's cookie value: a unix time, if any.
+        `subject` is the user id of the request's access token, if any.
+        """
+        if not self.enabled:
+            return False
+        try:
+            if sticky_until and float(sticky_until) > time.time():
+                self.sticky_reads += 1
+                return False
+        except ValueError:
+            pass
+        if self.is_recent_writer(subject):
+            self.sticky_reads += 1
+            return False
+        if not self.replica_current():
+            self.lagging_reads += 1
+            return False
+        self.replica_reads += 1
+        return True
+
+    def session_factory(
+        self, sticky_until: Optional[str], subject: Optional[str] = None
+    ) -> async_sessionmaker:
+        if self.use_replica(sticky_until, subject):
+            get_replica_engine()
+            return ReplicaSessionLocal
+        get_engine()
+        return SessionLocal
+
+    async def check_lag(self, engine: AsyncEngine) -> None:
+        try:
+            async with engine.connect() as conn:
+                lag = (await conn.execute(LAG_SQL)).scalar()
+        except Exception as e:
+            self.lag_seconds = None
+            logger.error(f"Replica lag check failed, reading from the primary: {str(e)}")
+            return
+        # NULL while a fresh standby has not replayed any transaction yet
+        self.lag_seconds = None if lag is None else float(lag)
+        if self.lag_seconds is not None and self.lag_seconds > settings.DB_REPLICA_MAX_LAG_SECONDS:
+            logger.warning(
+                f"Replica is {self.lag_seconds:.1f}s behind, reading from the primary"
+            )
+
+    async def _check_forever(self, engine: AsyncEngine) -> None:
+        while True:
+            await self.check_lag(engine)
+            await asyncio.sleep(settings.DB_REPLICA_LAG_CHECK_SECONDS)
+
+    def start(self) -> None:
+        engine = get_replica_engine()
+        if engine is not None and settings.DB_REPLICA_LAG_CHECK_SECONDS and self._task is None:
+            self._task = asyncio.create_task(
+                self._check_forever(engine), name="replica-lag-check"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "lag_seconds": self.lag_seconds,
+            "current": self.enabled and self.replica_current(),
+            "replica_reads": self.replica_reads,
+            "sticky_primary_reads": self.sticky_reads,
+            "recent_writers": len(self.writers),
+            "lagging_primary_reads": self.lagging_reads,
+        }
+        engine = get_replica_engine()
+        if engine is not None:
+            stats["pool"] = engine.pool.stats()
+        return stats
+
+
+replica_router = ReplicaRouter()
+invalidation_bus.register("writer", replica_router.remember_writers)
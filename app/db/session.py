@@ -1,13 +1,72 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
+from app.db import tracing
+from app.db.pool import InstrumentedQueuePool
+
+_engine: Optional[AsyncEngine] = None
+_replica_engine: Optional[AsyncEngine] = None
 
-engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to their engines by get_engine() and get_replica_engine()
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False)
+ReplicaSessionLocal = async_sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+
+def _create_engine(url: str) -> AsyncEngine:
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        # Applied by asyncpg to every new connection
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+        }
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    tracing.install(engine.sync_engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """
+    The engine of this worker, created on first use (normally by the app's
+    lifespan) so that importing the app does not load the database driver.
+    """
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(settings.DATABASE_URL)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_replica_engine() -> Optional[AsyncEngine]:
+    """The read replica's engine, or None when no replica is configured."""
+    global _replica_engine
+    if _replica_engine is None and settings.DATABASE_REPLICA_URL:
+        _replica_engine = _create_engine(settings.DATABASE_REPLICA_URL)
+        ReplicaSessionLocal.configure(bind=_replica_engine)
+    return _replica_engine
+
+
+async def dispose_engine() -> None:
+    """Close the pooled connections; the engines reconnect if used again."""
+    for engine in (_engine, _replica_engine):
+        if engine is not None:
+            await engine.dispose()
+
+
 async def get_db():
+    get_engine()
     async with SessionLocal() as session:
-        yield session 
\ No newline at end of file
+        yield session
@@ -0,0 +1,108 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Queries issued and time spent in the database during one request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f}, db-queries;desc="{self.count}"'
+
+
+# Set per request by QueryTracingMiddleware; None outside of a request
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+class QueryTracer:
+    """Process-wide counters for slow queries and query budget overruns."""
+
+    def __init__(self) -> None:
+        self.slow_queries = 0
+        self.budget_exceeded: Dict[Tuple[str, str], int] = {}
+
+    def check_budget(self, method: str, route: str, stats: QueryStats) -> None:
+        budget = settings.DB_QUERY_BUDGETS.get(f"{method} {route}", settings.DB_QUERY_BUDGET)
+        if budget and stats.count > budget:
+            key = (method, route)
+            self.budget_exceeded[key] = self.budget_exceeded.get(key, 0) + 1
+            logger.warning(
+                f"{method} {route} made {stats.count} queries "
+                f"({stats.seconds * 1000:.1f} ms), budget is {budget}"
+            )
+
+
+query_tracer = QueryTracer()
+
+
+def _explain(connection: Any, statement: str, parameters: Any) -> str:
+    # A raw DBAPI cursor, so the EXPLAIN itself is neither traced nor logged.
+    # The savepoint is always rolled back: whatever running the statement again
+    # did is undone, and a failed EXPLAIN leaves the caller's transaction usable.
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT explain_slow_query")
+        try:
+            cursor.execute(f"EXPLAIN ANALYZE {statement}", parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+            cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+    threshold = settings.DB_SLOW_QUERY_MS
+    if not threshold or elapsed * 1000 < threshold:
+        return
+    query_tracer.slow_queries += 1
+    message = f"Slow query ({elapsed * 1000:.1f} ms): {statement}"
+    # EXPLAIN ANALYZE runs the statement again, so only for reads that opt in
+    # with .execution_options(explain_slow=True): a SELECT can still have side
+    # effects, e.g. SELECT pg_notify(...)
+    if (
+        settings.DB_SLOW_QUERY_EXPLAIN
+        and conn.dialect.name == "postgresql"
+        and not executemany
+        and context.execution_options.get("explain_slow")
+        and statement.lstrip()[:6].upper() == "SELECT"
+        and not context.execution_options.get("stream_results")
+    ):
+        try:
+            message += "\n" + _explain(conn, statement, parameters)
+        except Exception as exc:
+            message += f"\n(EXPLAIN ANALYZE failed: {exc})"
+    logger.warning(message)
+
+
+def install(engine: Engine) -> None:
+    """Attach query counting and slow-query logging to a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,10 +1,55 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api.v1.endpoints import auth, users, companies
+from app.api.v1.endpoints import auth, users, companies, metrics
+from app.core import security
 from app.core.config import settings
+from app.core.hashing import PasswordHasherBusy, password_hasher
+from app.core.middleware import (
+    CompressionMiddleware,
+    MetricsMiddleware,
+    QueryTracingMiddleware,
+    ReadYourWritesMiddleware,
+)
+from app.core.notifications import notification_dispatcher
+from app.core.singleflight import SingleFlightTimeout
+from app.crud.crud_token import revoked_token
+from app.db.invalidation import invalidation_bus
+from app.db.replica import replica_router
+from app.db.session import SessionLocal, dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.PASSWORD_HASH_TARGET_MS > 0:
+        options = await asyncio.to_thread(
+            security.calibrate, password_hasher.context_options, settings.PASSWORD_HASH_TARGET_MS
+        )
+        password_hasher.configure(options)
+        stats = password_hasher.stats()
+        logger.info(f"Password hashing calibrated to {stats['scheme']} cost {stats['cost']}")
+    get_engine()
+    await notification_dispatcher.start()
+    revoked_token.start(SessionLocal)
+    replica_router.start()
+    invalidation_bus.start()
+    yield
+    await invalidation_bus.stop()
+    await replica_router.stop()
+    await revoked_token.stop()
+    await notification_dispatcher.stop(timeout=settings.DISCORD_SHUTDOWN_TIMEOUT_SECONDS)
+    password_hasher.shutdown()
+    await dispose_engine()
 
-app = FastAPI(title="IQX Backend")
+
+app = FastAPI(title="IQX Backend", lifespan=lifespan)
 
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
@@ -16,6 +61,33 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryTracingMiddleware)
+# Added last so it is the outermost middleware and times the whole request
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(SingleFlightTimeout)
+async def single_flight_timeout_handler(request: Request, exc: SingleFlightTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is slow to respond, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-app.include_router(companies.router, prefix="/api/v1/companies", tags=["companies"]) 
\ No newline at end of file
+app.include_router(companies.router, prefix="/api/v1/companies", tags=["companies"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+app.include_router(metrics.prometheus_router)
\ No newline at end of file
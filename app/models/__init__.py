@@ -1,2 +1,4 @@
 from app.models.user import User
 from app.models.company import Company
+from app.models.revoked_token import RevokedToken
+from app.models.table_watermark import TableWatermark
@@ -1,11 +1,29 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, Integer, func
+from sqlalchemy import Column, Computed, Index, String, Text, DateTime, Integer, func
+from sqlalchemy.orm import deferred
 
 from app.db.session import Base
 
+# Accent-folded, lower-cased text that company search matches against. It is a
+# stored generated column so the trigram index and the query share one definition.
+SEARCH_DOCUMENT_SQL = (
+    "lower(f_unaccent("
+    "coalesce(symbol, '') || ' ' || coalesce(organ_code, '') || ' ' || "
+    "coalesce(organ_short_name, '') || ' ' || coalesce(organ_name, '')"
+    "))"
+)
+
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        Index(
+            "ix_companies_search_document_trgm",
+            "search_document",
+            postgresql_using="gin",
+            postgresql_ops={"search_document": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(20), index=True, unique=True)
@@ -19,4 +37,5 @@ class Company(Base):
     organ_name = Column(String(255), index=True)
     business_descriptions = Column(Text, nullable=True)
     create_date = Column(DateTime, default=datetime.utcnow)
-    update_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    update_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
+    search_document = deferred(Column(Text, Computed(SEARCH_DOCUMENT_SQL, persisted=True)))
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, DateTime, String, func
+
+from app.db.session import Base
+
+
+class TableWatermark(Base):
+    """
+    Change counter per table, bumped by a statement-level trigger on every
+    write (see the add_table_watermarks migration). Reading it is one primary
+    key lookup, which makes it a cheap validator for cached list pages.
+    """
+
+    __tablename__ = "table_watermarks"
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -20,6 +20,8 @@ class User(Base):
     role = Column(Enum(Role), default=Role.USER, nullable=False)
     verified = Column(Boolean(), default=False, nullable=False)
     is_active = Column(Boolean(), default=True)
+    # Bumped to revoke every token issued to the user so far
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     create_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     update_date = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
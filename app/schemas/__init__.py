@@ -1,8 +1,15 @@
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB
 from app.schemas.token import Token, TokenPayload
-from app.schemas.company import Company, CompanyCreate, CompanyUpdate
+from app.schemas.company import (
+    Company,
+    CompanyBatch,
+    CompanyCreate,
+    CompanyUpdate,
+    CompanyImportError,
+    CompanyImportResult,
+)
 
-from typing import Generic, TypeVar, Sequence, Optional, Dict, Any
+from typing import Generic, TypeVar, Sequence, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
 T = TypeVar("T")
@@ -12,19 +19,29 @@ class PaginationParams(BaseModel):
     limit: int = Field(100, ge=1, le=1000)
     search: Optional[str] = None
     page: int = Field(1, ge=1)
+    cursor: Optional[str] = None
+    order_by: Optional[Literal["id", "symbol"]] = None
+    count: Literal["exact", "estimate", "none"] = "exact"
+
+def page_count(total: Optional[int], page_size: int) -> Optional[int]:
+    if total is None:
+        return None
+    return (total + page_size - 1) // page_size if total > 0 else 0
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: Sequence[T]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int]
     
     @classmethod
-    def create(cls, items: Sequence[T], total: int, params: PaginationParams) -> "PaginatedResponse[T]":
+    def create(
+        cls, items: Sequence[T], total: Optional[int], params: PaginationParams
+    ) -> "PaginatedResponse[T]":
         page_size = params.limit
         page = params.page
-        pages = (total + page_size - 1) // page_size if total > 0 else 0
+        pages = page_count(total, page_size)
         return cls(
             items=items,
             total=total,
@@ -32,3 +49,14 @@ class PaginatedResponse(BaseModel, Generic[T]):
             page_size=page_size,
             pages=pages
         )
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    items: Sequence[T]
+    page_size: int
+    next_cursor: Optional[str] = None
+
+    @classmethod
+    def create(
+        cls, items: Sequence[T], next_cursor: Optional[str], params: PaginationParams
+    ) -> "CursorPaginatedResponse[T]":
+        return cls(items=items, page_size=params.limit, next_cursor=next_cursor)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -44,4 +44,26 @@ class CompanyInDBBase(CompanyBase):
 
 
 class Company(CompanyInDBBase):
-    pass 
\ No newline at end of file
+    pass 
+
+
+class CompanyBatch(BaseModel):
+    items: List[Company] = Field(..., description="Companies found, in request order")
+    missing: List[Union[int, str]] = Field(..., description="Requested keys with no company")
+
+
+class CompanyImportError(BaseModel):
+    line: int = Field(..., description="Line number of the rejected row in the uploaded file")
+    symbol: Optional[str] = None
+    errors: List[str]
+
+
+class CompanyImportResult(BaseModel):
+    received: int = Field(..., description="Number of data rows read from the upload")
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[CompanyImportError] = Field(
+        default_factory=list, description="Per-row errors, capped at `max_errors` entries"
+    )
+    errors_truncated: bool = False
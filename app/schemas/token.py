@@ -9,6 +9,12 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: Optional[UUID] = None
+    exp: Optional[int] = None
+    iat: Optional[int] = None
+    jti: Optional[str] = None
+    # "access" or "refresh"; tokens issued before these claims existed have neither
+    type: Optional[str] = None
+    ver: int = 0
 
 class RefreshToken(BaseModel):
     refresh_token: str 
\ No newline at end of file
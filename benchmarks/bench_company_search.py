@@ -0,0 +1,145 @@
+"""
+Compare the legacy four-way ILIKE company search with the trigram search.
+
+The benchmark clones the `companies` table definition (including the generated
+search column and its GIN index) into a scratch schema, seeds it with synthetic
+Vietnamese company names and times both queries for a set of search terms. The
+database in DATABASE_URL must already be migrated:
+
+    poetry run alembic upgrade head
+    poetry run python -m benchmarks.bench_company_search --rows 100000
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.crud.crud_company import company as crud_company
+from app.models.company import Company
+from benchmarks.common import dump_json, print_table, summarize
+
+DEFAULT_TERMS = ["VCB", "ngan hang", "Ngân hàng", "dau khi sai gon", "B1234", "thep"]
+
+SEED_SQL = """
+INSERT INTO companies (
+    id, symbol, organ_code, organ_short_name, organ_name,
+    business_descriptions, create_date, update_date
+)
+SELECT
+    i,
+    'B' || i,
+    'ORG' || i,
+    (ARRAY['Đầu tư', 'Xây dựng', 'Chứng khoán', 'Bất động sản', 'Dầu khí', 'Thép',
+           'Điện lực', 'Thủy sản', 'Dược phẩm', 'Vận tải', 'Công nghệ', 'Bảo hiểm'])[i % 12 + 1]
+        || ' ' ||
+    (ARRAY['Sài Gòn', 'Hà Nội', 'Việt Nam', 'Đà Nẵng', 'Á Châu', 'Phương Đông',
+           'Kỹ Thương', 'Ngoại Thương', 'Cần Thơ'])[i % 9 + 1],
+    (ARRAY['Ngân hàng TMCP', 'Công ty Cổ phần', 'Tổng Công ty', 'Tập đoàn'])[i % 4 + 1]
+        || ' ' ||
+    (ARRAY['Đầu tư', 'Xây dựng', 'Chứng khoán', 'Bất động sản', 'Dầu khí', 'Thép',
+           'Điện lực', 'Thủy sản', 'Dược phẩm', 'Vận tải', 'Công nghệ', 'Bảo hiểm'])[i % 12 + 1]
+        || ' ' ||
+    (ARRAY['Sài Gòn', 'Hà Nội', 'Việt Nam', 'Đà Nẵng', 'Á Châu', 'Phương Đông',
+           'Kỹ Thương', 'Ngoại Thương', 'Cần Thơ'])[i % 9 + 1]
+        || ' ' || i,
+    repeat('Hoạt động kinh doanh chính. ', 8),
+    now(),
+    now()
+FROM generate_series(1, :rows) AS i
+"""
+
+
+async def legacy_search(db: AsyncSession, search: str, limit: int = 100):
+    """The query `CRUDCompany.get_multi` ran before the trigram index existed."""
+    search_term = f"%{search}%"
+    query = select(Company).filter(
+        or_(
+            Company.symbol.ilike(search_term),
+            Company.organ_code.ilike(search_term),
+            Company.organ_short_name.ilike(search_term),
+            Company.organ_name.ilike(search_term),
+        )
+    )
+    total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
+    result = await db.execute(query.offset(0).limit(limit))
+    return result.scalars().all(), total
+
+
+async def indexed_search(db: AsyncSession, search: str, limit: int = 100):
+    # Recount every sample like legacy_search does, so the comparison measures
+    # the index and not the total served from the count cache
+    crud_company.count_cache.clear()
+    return await crud_company.get_multi(db, skip=0, limit=limit, search=search)
+
+
+async def seed(engine, schema: str, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+        await conn.execute(
+            text(f'CREATE TABLE "{schema}".companies (LIKE public.companies INCLUDING ALL)')
+        )
+        await conn.execute(text(SEED_SQL), {"rows": rows})
+        await conn.execute(text(f'ANALYZE "{schema}".companies'))
+
+
+async def time_query(session_factory, fn, term: str, repeat: int) -> dict:
+    samples: List[float] = []
+    hits: Optional[int] = None
+    top: Optional[str] = None
+    for _ in range(repeat):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            items, total = await fn(db, term)
+            samples.append((time.perf_counter() - start) * 1000)
+        hits, top = total, items[0].symbol if items else None
+    return {"total": hits, "top": top, **summarize(samples)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        connect_args={"server_settings": {"search_path": f"{args.schema},public"}},
+    )
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    try:
+        if not args.skip_seed:
+            print(f"Seeding {args.rows} companies into schema {args.schema!r}...")
+            await seed(engine, args.schema, args.rows)
+
+        results = []
+        for term in args.terms:
+            for name, fn in (("legacy_ilike", legacy_search), ("trigram", indexed_search)):
+                # Warm the plan cache and shared buffers once before measuring
+                await time_query(session_factory, fn, term, 1)
+                stats = await time_query(session_factory, fn, term, args.repeat)
+                results.append({"term": term, "query": name, **stats})
+
+        print_table(results, ["term", "query", "total", "top", "p50", "p95", "p99", "mean"])
+        if args.json:
+            dump_json(args.json, {"rows": args.rows, "repeat": args.repeat, "results": results})
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--schema", default="bench_search")
+    parser.add_argument("--terms", nargs="+", default=DEFAULT_TERMS)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse a kept schema")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
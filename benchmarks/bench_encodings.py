@@ -0,0 +1,167 @@
+"""
+Measure response size and encode CPU time for each representation of a
+company page: JSON or MessagePack, sent as is or compressed with gzip, br or
+zstd at the configured levels (COMPRESSION_* settings, e.g. from .env).
+
+No database is needed. Pages are synthesized with varied Vietnamese names and
+descriptions so that compression ratios are not flattered by repetition.
+Representations whose package is not installed are skipped.
+
+    poetry run python -m benchmarks.bench_encodings --page-size 20 --page-size 100
+    poetry run python -m benchmarks.bench_encodings --fields all --json encodings.json
+"""
+import argparse
+import gc
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from app import schemas
+from app.api.v1.deps import COMPANY_FIELDS, COMPANY_LIST_FIELDS
+from app.core.compression import Compressor, is_available
+from app.core.config import settings
+from app.core.serialization import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    msgpack_available,
+    render_company_page,
+)
+from benchmarks.common import dump_json, print_table, summarize
+
+WORDS = (
+    "sản xuất kinh doanh thương mại dịch vụ đầu tư xây dựng bất động sản ngân hàng "
+    "chứng khoán bảo hiểm vận tải logistics thép xi măng điện năng lượng dầu khí "
+    "thủy sản nông nghiệp phân bón hóa chất dược phẩm thiết bị y tế công nghệ thông tin "
+    "viễn thông bán lẻ xuất nhập khẩu khai thác khoáng sản cao su dệt may da giày"
+).split()
+NAMES = (
+    "Ngân hàng", "Tổng Công ty", "Công ty Cổ phần", "Tập đoàn", "Công ty TNHH",
+)
+GROUPS = ("VN30", "HOSE", "HNX", "UPCOM")
+
+
+def make_rows(count: int, columns: List[str], seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    base = datetime(2025, 7, 7, 1, 36, 27, 111222)
+    rows = []
+    for i in range(count):
+        activity = " ".join(rng.choices(WORDS, k=3)).title()
+        values = {
+            "id": rng.randint(1, 2_000_000),
+            "symbol": "".join(rng.choices("ABCDEFGHIKLMNPQRSTUVXY", k=3)),
+            "organ_code": f"ORG{rng.randint(1000, 99999)}",
+            "isin_code": f"VN000000{rng.randint(1000, 9999)}",
+            "com_group_code": rng.choice(GROUPS),
+            "icb_code": str(rng.randint(1000, 9999)),
+            "organ_type_code": rng.choice(("NH", "CK", "BH", "DN")),
+            "com_type_code": rng.choice(("NH", "CK", "BH", "CT")),
+            "organ_short_name": f"{activity} {i}",
+            "organ_name": f"{rng.choice(NAMES)} {activity} Việt Nam",
+            "business_descriptions": " ".join(rng.choices(WORDS, k=rng.randint(60, 200))),
+            "create_date": base - timedelta(days=rng.randint(0, 3000)),
+            "update_date": base + timedelta(seconds=rng.randint(0, 10_000_000)),
+        }
+        rows.append({name: values[name] for name in columns})
+    return rows
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> Dict[str, Any]:
+    body = fn()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"body": body, **summarize(samples)}
+
+
+def compress(encoding: str, body: bytes) -> bytes:
+    compressor = Compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def measure_page(page_size: int, columns: List[str], repeat: int) -> List[Dict[str, Any]]:
+    rows = make_rows(page_size, columns)
+    params = schemas.PaginationParams(skip=0, limit=page_size, page=1)
+    media_types = [JSON_MEDIA_TYPE] + ([MSGPACK_MEDIA_TYPE] if msgpack_available() else [])
+    encodings = ["identity"] + [e for e in ("gzip", "br", "zstd") if is_available(e)]
+    results = []
+    for media_type in media_types:
+        rendered = timed(
+            lambda: render_company_page(rows, 5000, params, media_type), repeat
+        )
+        body = rendered["body"]
+        for encoding in encodings:
+            if encoding == "identity":
+                wire, compress_ms = body, 0.0
+            else:
+                compressed = timed(lambda: compress(encoding, body), repeat)
+                wire, compress_ms = compressed["body"], compressed["p50"]
+            results.append(
+                {
+                    "page_size": page_size,
+                    "format": media_type.split("/")[1],
+                    "encoding": encoding,
+                    "bytes": len(wire),
+                    "ratio": len(wire) / len(body),
+                    "encode_ms": rendered["p50"],
+                    "compress_ms": compress_ms,
+                    "total_ms": rendered["p50"] + compress_ms,
+                }
+            )
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    columns = list(COMPANY_FIELDS if args.fields == "all" else COMPANY_LIST_FIELDS)
+    missing = [
+        name
+        for name, available in (
+            ("msgpack", msgpack_available()),
+            ("br (brotli)", is_available("br")),
+            ("zstd (zstandard)", is_available("zstd")),
+        )
+        if not available
+    ]
+    if missing:
+        print(f"skipped, not installed: {', '.join(missing)}")
+    results = []
+    for page_size in args.page_size or [20, 100]:
+        results.extend(measure_page(page_size, columns, args.repeat))
+    print_table(
+        results,
+        ["page_size", "format", "encoding", "bytes", "ratio", "encode_ms", "compress_ms", "total_ms"],
+    )
+    if args.json:
+        dump_json(
+            args.json,
+            {
+                "fields": args.fields,
+                "levels": {
+                    "gzip": settings.COMPRESSION_GZIP_LEVEL,
+                    "br": settings.COMPRESSION_BROTLI_QUALITY,
+                    "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+                },
+                "results": results,
+            },
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, action="append")
+    parser.add_argument(
+        "--fields",
+        choices=["list", "all"],
+        default="list",
+        help="list: default list page columns; all: include business_descriptions",
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
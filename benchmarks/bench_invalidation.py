@@ -0,0 +1,190 @@
+"""
+Check cross-worker cache invalidation against a real Postgres.
+
+Starts `--workers` processes that each run the LISTEN/NOTIFY listener as an
+app worker would, then updates a company and a user `--writes` times through
+the CRUD layer of this process and measures how long each write takes to
+reach every worker. Finally it kills the listener connections on the server
+(pg_terminate_backend) and measures how long the workers take to reconnect
+and flush their caches.
+
+Needs the database in DATABASE_URL, migrated (see bench_api):
+
+    poetry run python -m benchmarks.bench_invalidation --workers 4 --writes 200
+"""
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, text
+
+from app import crud
+from app.core import security
+from app.db.invalidation import APPLICATION_NAME, invalidation_bus
+from app.db.session import SessionLocal, dispose_engine, get_engine
+from app.models.company import Company
+from app.models.user import User
+from benchmarks.common import dump_json, print_table, summarize
+
+KINDS = ("company", "user")
+
+
+async def run_worker(index: int, events: Any, stop: Any) -> None:
+    for kind in KINDS:
+        # Registered after the CRUD caches, so it runs once they are evicted.
+        # Events are (worker, kind, keys or None for a flush, time received).
+        invalidation_bus.register(
+            kind, lambda keys, kind=kind: events.put((index, kind, keys, time.time()))
+        )
+    invalidation_bus.start()
+    while not stop.is_set():
+        await asyncio.sleep(0.05)
+    await invalidation_bus.stop()
+
+
+def worker_main(index: int, events: Any, stop: Any) -> None:
+    asyncio.run(run_worker(index, events, stop))
+
+
+async def wait_for(
+    events: Any, expected: Set[Tuple[int, str]], timeout: float, keys: Optional[List[str]]
+) -> Dict[int, float]:
+    """Receive times per worker once every (worker, kind) in `expected` saw `keys`."""
+    received: Dict[int, float] = {}
+    deadline = time.monotonic() + timeout
+    while expected:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"No invalidation from {sorted(expected)}")
+        try:
+            index, kind, event_keys, at = await asyncio.to_thread(events.get, True, remaining)
+        except queue.Empty:
+            continue
+        if event_keys == keys and (index, kind) in expected:
+            expected.discard((index, kind))
+            received[index] = max(received.get(index, 0.0), at)
+    return received
+
+
+class Fixture:
+    def __init__(self) -> None:
+        self.prefix = f"IV{uuid.uuid4().hex[:5].upper()}"
+        self.user_id = uuid.uuid4()
+        self.company_id = 0
+
+    async def seed(self) -> None:
+        now = datetime.utcnow()
+        async with SessionLocal() as db:
+            result = await db.execute(
+                insert(Company)
+                .values(
+                    symbol=self.prefix,
+                    organ_code=f"ORG-{self.prefix}",
+                    organ_short_name="Invalidation",
+                    organ_name="Invalidation bench",
+                    create_date=now,
+                    update_date=now,
+                )
+                .returning(Company.id)
+            )
+            self.company_id = result.scalar_one()
+            await db.execute(
+                insert(User).values(
+                    id=self.user_id,
+                    email=f"{self.prefix.lower()}@loadtest.example.com",
+                    full_name="Invalidation bench",
+                    hashed_password=security.get_password_hash("invalidation-bench"),
+                )
+            )
+            await db.commit()
+
+    async def cleanup(self) -> None:
+        async with SessionLocal() as db:
+            await db.execute(delete(Company).where(Company.id == self.company_id))
+            await db.execute(delete(User).where(User.id == self.user_id))
+            await db.commit()
+
+    async def write(self, i: int) -> Tuple[str, str]:
+        async with SessionLocal() as db:
+            if i % 2:
+                user = await crud.user.get(db, id=self.user_id)
+                await crud.user.update(db, db_obj=user, obj_in={"full_name": f"Bench {i}"})
+                return "user", str(self.user_id)
+            company = await crud.company.get(db, id=self.company_id)
+            await crud.company.update(db, db_obj=company, obj_in={"organ_name": f"Bench {i}"})
+            return "company", str(self.company_id)
+
+
+async def main(args: argparse.Namespace) -> None:
+    get_engine()
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    stop = context.Event()
+    workers = [
+        context.Process(target=worker_main, args=(index, events, stop), daemon=True)
+        for index in range(args.workers)
+    ]
+    for process in workers:
+        process.start()
+    everyone = {(index, kind) for index in range(args.workers) for kind in KINDS}
+    fixture = Fixture()
+    try:
+        # Every listener flushes once it is connected
+        await wait_for(events, set(everyone), args.timeout, None)
+        await fixture.seed()
+
+        latencies: Dict[str, List[float]] = {kind: [] for kind in KINDS}
+        for i in range(args.writes):
+            started = time.time()
+            kind, key = await fixture.write(i)
+            expected = {(index, kind) for index in range(args.workers)}
+            received = await wait_for(events, expected, args.timeout, [key])
+            latencies[kind].extend((at - started) * 1000 for at in received.values())
+
+        async with SessionLocal() as db:
+            killed = (
+                await db.execute(
+                    text(
+                        "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+                        "WHERE application_name = :name"
+                    ),
+                    {"name": APPLICATION_NAME},
+                )
+            ).scalar()
+        killed_at = time.time()
+        received = await wait_for(events, set(everyone), args.timeout, None)
+        recovery = [(at - killed_at) * 1000 for at in received.values()]
+    finally:
+        stop.set()
+        await fixture.cleanup()
+        for process in workers:
+            process.join(timeout=10)
+        await dispose_engine()
+
+    results = [
+        {"phase": f"{kind} write -> evicted", **summarize(samples)}
+        for kind, samples in latencies.items()
+    ]
+    results.append({"phase": "listener killed -> flushed", **summarize(recovery)})
+    print_table(results, ["phase", "n", "p50", "p95", "p99", "max"])
+    print(f"listener connections terminated: {killed}")
+    if args.json:
+        dump_json(args.json, {"workers": args.workers, "writes": args.writes, "results": results})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait per step")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,120 @@
+"""
+Measure GET /companies latency while a burst of logins is hashing passwords.
+
+The app runs in-process on the benchmark's event loop (httpx ASGITransport), so
+any bcrypt work done on the loop shows up directly as /companies latency. Each
+scenario runs the same burst with the password hasher in a different mode:
+
+    poetry run python -m benchmarks.bench_login_burst --logins 50
+
+Uses the database in DATABASE_URL; a throwaway user is created and removed.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import List
+
+import httpx
+from sqlalchemy import delete
+
+from app.core.hashing import password_hasher
+from app.crud import crud_user
+from app.db.session import SessionLocal, get_engine
+from app.main import app
+from app.models.user import User
+from app.schemas.user import UserCreate
+from benchmarks.common import dump_json, print_table, summarize
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, *, mode: str, email: str, password: str, logins: int, probes: int
+) -> dict:
+    password_hasher.shutdown()
+    password_hasher.executor_kind = mode
+    latencies: List[float] = []
+    stop = asyncio.Event()
+
+    async def probe() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = await client.get("/api/v1/companies/", params={"page_size": 20})
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    async def login() -> int:
+        response = await client.post(
+            "/api/v1/auth/login", data={"username": email, "password": password}
+        )
+        return response.status_code
+
+    probe_tasks = [asyncio.create_task(probe()) for _ in range(probes)]
+    start = time.perf_counter()
+    if logins:
+        statuses = await asyncio.gather(*(login() for _ in range(logins)))
+    else:
+        # Idle baseline: probe for as long as a typical burst takes
+        await asyncio.sleep(2.0)
+        statuses = []
+    burst_seconds = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*probe_tasks)
+    return {
+        "scenario": f"{mode} hasher" if logins else "idle",
+        "logins": logins,
+        "login_ok": sum(1 for status in statuses if status == 200),
+        "burst_s": burst_seconds,
+        **summarize(latencies),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    password = "bench-password"
+    get_engine()
+    async with SessionLocal() as db:
+        await crud_user.user.create(
+            db, obj_in=UserCreate(email=email, full_name="Benchmark", password=password)
+        )
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = [
+                await run_scenario(
+                    client, mode="thread", email=email, password=password,
+                    logins=0, probes=args.probes,
+                )
+            ]
+            for mode in args.modes:
+                results.append(
+                    await run_scenario(
+                        client, mode=mode, email=email, password=password,
+                        logins=args.logins, probes=args.probes,
+                    )
+                )
+        print_table(
+            results, ["scenario", "logins", "login_ok", "burst_s", "n", "p50", "p95", "p99", "max"]
+        )
+        if args.json:
+            dump_json(args.json, {"logins": args.logins, "results": results})
+    finally:
+        password_hasher.shutdown()
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.email == email))
+            await db.commit()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=4, help="Concurrent /companies pollers")
+    parser.add_argument(
+        "--modes", nargs="+", default=["inline", "thread", "process"],
+        choices=["inline", "thread", "process"],
+    )
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
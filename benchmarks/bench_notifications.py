@@ -0,0 +1,92 @@
+"""
+Deliver a signup burst to a fake, rate-limited Discord: per-message sends vs the dispatcher.
+
+Runs offline against FakeDiscordTransport, which adds API latency and answers
+429 once more than --rate-limit calls land in a --rate-window second window.
+
+    poetry run python -m benchmarks.bench_notifications --messages 200
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.notifications import (
+    REGISTRATION_TITLE,
+    FakeDiscordTransport,
+    NotificationDispatcher,
+    RateLimited,
+    build_embeds,
+)
+from benchmarks.common import dump_json, print_table
+
+
+def make_transport(args: argparse.Namespace) -> FakeDiscordTransport:
+    return FakeDiscordTransport(
+        latency=args.latency_ms / 1000, rate_limit=args.rate_limit, rate_window=args.rate_window
+    )
+
+
+async def per_message(args: argparse.Namespace) -> dict:
+    # The old behaviour: one background task and one API call per message
+    transport = make_transport(args)
+
+    async def send(i: int) -> None:
+        embeds = build_embeds(REGISTRATION_TITLE, [f"**Email:** user{i}@example.com"])
+        while True:
+            try:
+                await transport.send(1, embeds)
+                return
+            except RateLimited as exc:
+                await asyncio.sleep(exc.retry_after)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(args.messages)))
+    return {
+        "mode": "per-message",
+        "delivered": len(transport.sent),
+        "api_calls": transport.calls,
+        "429s": transport.rate_limited,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+async def dispatcher(args: argparse.Namespace) -> dict:
+    transport = make_transport(args)
+    notifier = NotificationDispatcher(transport, channel_id=1, interval=args.interval)
+    await notifier.start()
+    start = time.perf_counter()
+    for i in range(args.messages):
+        notifier.notify(f"**Email:** user{i}@example.com", title=REGISTRATION_TITLE)
+        # Signups trickle in over the burst rather than all in one loop iteration
+        await asyncio.sleep(args.spread / args.messages)
+    await notifier.stop(timeout=600)
+    return {
+        "mode": "dispatcher",
+        "delivered": notifier.sent,
+        "api_calls": transport.calls,
+        "429s": transport.rate_limited,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    results = [await per_message(args), await dispatcher(args)]
+    print_table(results, ["mode", "delivered", "api_calls", "429s", "seconds"])
+    if args.json:
+        dump_json(args.json, {"args": vars(args), "results": results})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=1.0, help="Seconds the burst is spread over")
+    parser.add_argument("--interval", type=float, default=2.0, help="Dispatcher batch interval")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--rate-limit", type=int, default=5, help="Calls allowed per window")
+    parser.add_argument("--rate-window", type=float, default=5.0)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
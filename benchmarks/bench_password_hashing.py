@@ -0,0 +1,89 @@
+"""
+Print hash and verify latency for each password hashing scheme and cost.
+
+Runs on the current machine only, no database needed. Use it to choose
+PASSWORD_BCRYPT_ROUNDS (or a PASSWORD_HASH_TARGET_MS budget) per deployment:
+
+    poetry run python -m benchmarks.bench_password_hashing
+    poetry run python -m benchmarks.bench_password_hashing --bcrypt 10 11 12 13 --repeat 10
+"""
+import argparse
+import time
+from typing import List
+
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+from app.core import security
+from benchmarks.common import dump_json, print_table, summarize
+
+
+def measure(scheme: str, cost: int, repeat: int) -> dict:
+    options = {"schemes": [scheme]}
+    security.set_cost(options, scheme, cost)
+    context = CryptContext(**options)
+    hash_ms: List[float] = []
+    verify_ms: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hashed = context.hash("benchmark-password")
+        hash_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        context.verify("benchmark-password", hashed)
+        verify_ms.append((time.perf_counter() - start) * 1000)
+    hash_stats, verify_stats = summarize(hash_ms), summarize(verify_ms)
+    return {
+        "scheme": scheme,
+        "cost": cost,
+        "hash_p50": hash_stats["p50"],
+        "hash_max": hash_stats["max"],
+        "verify_p50": verify_stats["p50"],
+        "verify_max": verify_stats["max"],
+        # What one core can sustain; the login ceiling per hashing worker
+        "verifies_per_s": 1000 / verify_stats["p50"],
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    plan = [("bcrypt", cost) for cost in args.bcrypt]
+    plan += [("pbkdf2_sha256", cost) for cost in args.pbkdf2]
+    plan += [("argon2", cost) for cost in args.argon2]
+    results = []
+    for scheme, cost in plan:
+        # argon2 needs argon2-cffi, which is not a dependency of the app
+        has_backend = getattr(get_crypt_handler(scheme), "has_backend", lambda: True)
+        if not has_backend():
+            print(f"skipping {scheme} {cost}: backend not installed")
+            continue
+        results.append(measure(scheme, cost, args.repeat))
+    print_table(
+        results,
+        ["scheme", "cost", "hash_p50", "hash_max", "verify_p50", "verify_max", "verifies_per_s"],
+    )
+    if args.target_ms:
+        options = security.calibrate(security.context_options_from_settings(), args.target_ms)
+        scheme = options["schemes"][0]
+        cost = options[f"{scheme}__{security.COST_OPTIONS[scheme]}"]
+        print(f"calibrated for {args.target_ms} ms: {scheme} cost {cost}")
+    if args.json:
+        dump_json(args.json, {"repeat": args.repeat, "results": results})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bcrypt", type=int, nargs="*", default=[10, 11, 12, 13], help="Rounds")
+    parser.add_argument(
+        "--pbkdf2", type=int, nargs="*", default=[300_000, 600_000], help="Iterations"
+    )
+    parser.add_argument("--argon2", type=int, nargs="*", default=[2, 3], help="Time cost")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--target-ms", type=float, default=250.0,
+        help="Also show what startup calibration would pick for this budget (0 to skip)",
+    )
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,111 @@
+"""
+Microbenchmark company list serialization: response_model path vs fast path.
+
+No database is needed. Rows are synthesized as result tuples; the legacy path
+hydrates ORM objects and lets FastAPI validate and encode PaginatedResponse,
+the fast path builds dicts and dumps them with the precompiled TypeAdapter.
+
+    poetry run python -m benchmarks.bench_serialization --rows 1000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import schemas
+from app.api.v1.deps import COMPANY_FIELDS
+from app.core.serialization import render_company_page
+from app.models.company import Company
+from benchmarks.common import dump_json, print_table, summarize
+
+
+def make_tuples(count: int) -> List[Tuple[Any, ...]]:
+    base = datetime(2025, 7, 7, 1, 36, 27, 111222)
+    rows = []
+    for i in range(count):
+        values = {
+            "id": i + 1,
+            "symbol": f"S{i:04d}",
+            "organ_code": f"ORG{i}",
+            "isin_code": f"VN000000{i:04d}",
+            "com_group_code": "HOSE",
+            "icb_code": "8355",
+            "organ_type_code": "NH",
+            "com_type_code": "NH",
+            "organ_short_name": f"Ngân hàng {i}",
+            "organ_name": f"Ngân hàng Thương mại Cổ phần Ngoại thương Việt Nam {i}",
+            "business_descriptions": "Hoạt động kinh doanh chính của công ty. " * 20,
+            "create_date": base,
+            "update_date": base + timedelta(seconds=i),
+        }
+        rows.append(tuple(values[name] for name in COMPANY_FIELDS))
+    return rows
+
+
+async def legacy(rows, params, field) -> bytes:
+    companies = [Company(**dict(zip(COMPANY_FIELDS, row))) for row in rows]
+    page = schemas.PaginatedResponse.create(items=companies, total=len(rows), params=params)
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast(rows, params, field) -> bytes:
+    items = [dict(zip(COMPANY_FIELDS, row)) for row in rows]
+    return render_company_page(items, len(rows), params)
+
+
+def measure(fn: Callable, rows, params, field, repeat: int) -> dict:
+    run = lambda: asyncio.run(fn(rows, params, field))  # noqa: E731
+    body = run()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "bytes": len(body),
+        "peak_kib": peak / 1024,
+        "body": body,
+        **summarize(samples),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    rows = make_tuples(args.rows)
+    params = schemas.PaginationParams(skip=0, limit=args.rows, page=1)
+    field = create_model_field(
+        name="response", type_=schemas.PaginatedResponse[schemas.Company], mode="serialization"
+    )
+    results = []
+    for name, fn in (("response_model", legacy), ("fast_path", fast)):
+        results.append({"path": name, **measure(fn, rows, params, field, args.repeat)})
+    identical = results[0].pop("body") == results[1].pop("body")
+    print_table(results, ["path", "bytes", "p50", "p95", "mean", "peak_kib"])
+    print(f"identical JSON: {identical}")
+    if args.json:
+        dump_json(args.json, {"rows": args.rows, "identical": identical, "results": results})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
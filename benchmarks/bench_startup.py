@@ -0,0 +1,122 @@
+"""
+Measure the cold start of one worker: import time, lifespan startup, time to
+the first response and memory, each in a fresh interpreter.
+
+    poetry run python -m benchmarks.bench_startup --runs 5
+
+Every run starts a new Python process that imports `app.main`, runs the
+lifespan and serves one request in-process (httpx ASGITransport), like a
+freshly forked worker. The request defaults to `/metrics`, which needs no
+database; it is sent with METRICS_TOKEN (set to a throwaway one if unset). A separate `python -X importtime` run lists the packages that cost
+the most to import and whether optional dependencies were loaded eagerly.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.common import dump_json, print_table, summarize
+
+# Modules that should only be loaded when the feature using them runs
+OPTIONAL_MODULES = ["discord", "aiohttp", "asyncpg", "multiprocessing", "argon2"]
+
+_PROBE = """
+import asyncio, json, resource, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+import httpx
+from app.core.config import settings
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            headers = {"Authorization": f"Bearer {settings.METRICS_TOKEN}"}
+            response = await client.get(sys.argv[1], headers=headers)
+        responded = time.perf_counter()
+    return started, responded, response.status_code
+
+started, responded, status = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "lifespan_ms": (started - imported) * 1000,
+    "first_response_ms": (responded - started) * 1000,
+    "status": status,
+    # ru_maxrss is in KiB on Linux
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def probe(path: str) -> Dict[str, float]:
+    env = {"METRICS_TOKEN": "bench", **os.environ, "PYTHONPATH": os.getcwd()}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE, path], capture_output=True, text=True, check=True, env=env
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    # The last line; the app may log to stdout before it
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = wall_ms
+    return result
+
+
+def import_profile(top: int) -> Dict[str, object]:
+    """Self import time per top-level package, from `python -X importtime`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    self_us: Dict[str, int] = {}
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if not match:
+            continue
+        package = match.group(4).split(".")[0]
+        loaded.add(package)
+        self_us[package] = self_us.get(package, 0) + int(match.group(1))
+    heaviest = sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "packages": [{"package": name, "self_ms": us / 1000} for name, us in heaviest],
+        "optional_loaded": [name for name in OPTIONAL_MODULES if name in loaded],
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    # One untimed run so the first sample does not include writing .pyc files
+    probe(args.path)
+    runs: List[Dict[str, float]] = [probe(args.path) for _ in range(args.runs)]
+    rows = []
+    for key in ("process_ms", "import_ms", "lifespan_ms", "first_response_ms", "peak_rss_mb"):
+        rows.append({"metric": key, **summarize([run[key] for run in runs])})
+    print_table(rows, ["metric", "n", "mean", "p50", "max"])
+    print(f"status of GET {args.path}: {runs[-1]['status']}")
+
+    profile = import_profile(args.top)
+    print()
+    print_table(profile["packages"], ["package", "self_ms"])
+    print(f"optional modules loaded at import: {', '.join(profile['optional_loaded']) or 'none'}")
+    if args.json:
+        dump_json(args.json, {"path": args.path, "runs": runs, "summary": rows, **profile})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/metrics", help="Request served after startup")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed by import time")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,46 @@
+import json
+import math
+import statistics
+from typing import Any, Dict, Iterable, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples` (pct in 0..100)."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    return {
+        "n": len(samples_ms),
+        "mean": statistics.fmean(samples_ms) if samples_ms else float("nan"),
+        "p50": percentile(samples_ms, 50),
+        "p95": percentile(samples_ms, 95),
+        "p99": percentile(samples_ms, 99),
+        "max": max(samples_ms) if samples_ms else float("nan"),
+    }
+
+
+def print_table(rows: Iterable[Dict[str, Any]], columns: List[str]) -> None:
+    rows = list(rows)
+    widths = {
+        col: max([len(col)] + [len(_fmt(row.get(col))) for row in rows]) for col in columns
+    }
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(_fmt(row.get(col)).ljust(widths[col]) for col in columns))
+
+
+def dump_json(path: str, payload: Any) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, ensure_ascii=False, default=str)
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
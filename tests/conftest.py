@@ -0,0 +1,66 @@
+import asyncio
+import unicodedata
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.api.v1 import deps
+from app.core.config import settings
+from app.db.replica import replica_router
+from app.db.session import Base
+from app.main import app
+
+
+def _unaccent(value):
+    # Stand-in for the Postgres f_unaccent the search column is generated with
+    if value is None:
+        return None
+    value = value.replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in unicodedata.normalize("NFD", value) if not unicodedata.combining(c))
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """Sessions on a fresh in-memory SQLite database with the app's schema."""
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", False)
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("f_unaccent", 1, _unaccent, deterministic=True)
+
+    async def create_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, autoflush=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(session_factory):
+    """The app on the SQLite database, without running its lifespan."""
+
+    async def get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[deps.get_db] = get_db
+    app.dependency_overrides[deps.get_read_db] = get_db
+    app.dependency_overrides[deps.get_session_factory] = lambda: session_factory
+    app.dependency_overrides[deps.get_read_session_factory] = lambda: session_factory
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    deps.token_cache.clear()
+    crud.user.principal_cache.clear()
+    crud.company.count_cache.clear()
+    replica_router.writers.clear()
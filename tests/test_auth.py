@@ -0,0 +1,122 @@
+import asyncio
+from uuid import UUID
+
+from app import crud
+
+
+def _login(client, email="trader@example.com", password="secret123"):
+    client.post(
+        "/api/v1/auth/register", json={"email": email, "full_name": "Trader", "password": password}
+    )
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _me(client, tokens) -> int:
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return client.get("/api/v1/users/me", headers=headers).status_code
+
+
+def _refresh(client, tokens):
+    return client.post("/api/v1/auth/refresh-token", json={"refresh_token": tokens["refresh_token"]})
+
+
+def test_refresh_token_is_single_use(client):
+    tokens = _login(client)
+    response = _refresh(client, tokens)
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert _me(client, rotated) == 200
+
+
+def test_reused_refresh_token_revokes_every_session(client):
+    tokens = _login(client)
+    rotated = _refresh(client, tokens).json()
+    other_session = _login(client)
+
+    # The old token again means it was copied: every session of the user ends
+    assert _refresh(client, tokens).status_code == 403
+    assert _refresh(client, rotated).status_code == 403
+    assert _me(client, rotated) == 403
+    assert _me(client, other_session) == 403
+    assert _refresh(client, other_session).status_code == 403
+    assert _me(client, _login(client)) == 200
+
+
+def test_logout_revokes_the_access_and_refresh_token(client):
+    tokens = _login(client)
+    other_session = _login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = client.post(
+        "/api/v1/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 204
+    assert _me(client, tokens) == 403
+    # Only the session that logged out
+    assert _me(client, other_session) == 200
+    # A logged out refresh token presented again is treated like a reused one
+    assert _refresh(client, tokens).status_code == 403
+    assert _me(client, other_session) == 403
+
+
+def test_logout_all_revokes_every_session(client):
+    tokens = _login(client)
+    other_session = _login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.post("/api/v1/auth/logout-all", headers=headers).status_code == 204
+    for session in (tokens, other_session):
+        assert _me(client, session) == 403
+        assert _refresh(client, session).status_code == 403
+
+
+def _user_id(client, tokens) -> UUID:
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return UUID(client.get("/api/v1/users/me", headers=headers).json()["id"])
+
+
+def _change_user(session_factory, id, change):
+    async def run():
+        async with session_factory() as db:
+            await change(db, await crud.user.get(db, id=id))
+
+    asyncio.run(run())
+
+
+def test_user_update_evicts_the_cached_principal(client, session_factory):
+    tokens = _login(client)
+    id = _user_id(client, tokens)
+    assert crud.user.principal_cache.get(id) is not None
+
+    _change_user(
+        session_factory, id,
+        lambda db, user: crud.user.update(db, db_obj=user, obj_in={"full_name": "Renamed"}),
+    )
+    assert crud.user.principal_cache.get(id) is None
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).json()["full_name"] == "Renamed"
+
+
+def test_deactivated_user_is_rejected_from_the_principal_cache(client, session_factory):
+    tokens = _login(client)
+    id = _user_id(client, tokens)
+
+    _change_user(session_factory, id, lambda db, user: crud.user.deactivate(db, db_obj=user))
+    assert crud.user.principal_cache.get(id) is None
+    assert _me(client, tokens) == 400
+    # Cached again, and the cached copy is refused too
+    assert crud.user.principal_cache.get(id).is_active is False
+    assert _me(client, tokens) == 400
+
+
+def test_revoked_token_version_is_rejected_from_the_principal_cache(client, session_factory):
+    tokens = _login(client)
+    id = _user_id(client, tokens)
+
+    _change_user(session_factory, id, lambda db, user: crud.user.revoke_all_tokens(db, id=id))
+    assert crud.user.principal_cache.get(id) is None
+    assert _me(client, tokens) == 403
+    assert crud.user.principal_cache.get(id).token_version == 1
+    assert _me(client, tokens) == 403
+    assert _me(client, _login(client)) == 200
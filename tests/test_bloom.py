@@ -0,0 +1,14 @@
+import uuid
+
+from app.core.bloom import BloomFilter
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    added = [uuid.uuid4().hex for _ in range(10_000)]
+    for item in added:
+        bloom.add(item)
+    assert all(item in bloom for item in added)
+
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10_000))
+    assert false_positives < 300
@@ -0,0 +1,49 @@
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, timer=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_per_entry_ttl_cannot_exceed_cache_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, timer=clock)
+    cache.set("a", 1, ttl=60)
+    clock.now = 6
+    assert cache.get("a") is None
+
+
+def test_set_is_skipped_after_concurrent_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.pop("a")
+    cache.set("a", "stale", generation=generation)
+    assert cache.get("a") is None
+    cache.set("a", "fresh", generation=cache.generation)
+    assert cache.get("a") == "fresh"
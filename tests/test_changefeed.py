@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.changefeed import ChangeFeed, SlowConsumer
+from app.core.config import settings
+from app.crud import crud_company
+from app.schemas.company import CompanyCreate
+
+
+def _feed(**kwargs) -> ChangeFeed:
+    options = {"history": 10, "buffer": 5, "max_subscribers": 10, **kwargs}
+    return ChangeFeed(**options)
+
+
+def test_events_reach_every_subscriber_serialized_once():
+    async def run():
+        feed = _feed()
+        first, second = feed.subscribe(), feed.subscribe()
+        event = feed.publish("update", {"id": 1, "symbol": "VCB"})
+        return event, await first.next(1), await second.next(1)
+
+    event, first, second = asyncio.run(run())
+    assert first is second is event
+    assert json.loads(event.data) == {
+        "id": event.id,
+        "type": "update",
+        "company": {"id": 1, "symbol": "VCB"},
+    }
+
+
+def test_resume_replays_missed_events():
+    async def run():
+        feed = _feed()
+        feed.publish("create", {"id": 1})
+        resume_from = feed.last_event_id
+        feed.publish("update", {"id": 1})
+        feed.publish("delete", {"id": 1})
+        subscription = feed.subscribe(resume_from)
+        return subscription, [(await subscription.next(1)).type for _ in range(2)]
+
+    subscription, types = asyncio.run(run())
+    assert not subscription.reset
+    assert types == ["update", "delete"]
+
+
+def test_resume_point_out_of_history_or_from_another_process_resets():
+    async def run():
+        feed = _feed(history=2)
+        first = feed.publish("create", {"id": 1}).id
+        for i in range(3):
+            feed.publish("update", {"id": 1})
+        return feed, feed.subscribe(first), feed.subscribe("0badc0de-1"), feed.subscribe(
+            feed.last_event_id
+        )
+
+    feed, stale, foreign, current = asyncio.run(run())
+    assert stale.reset and not stale.backlog
+    assert foreign.reset
+    assert not current.reset and not current.backlog
+    assert feed.resets == 2
+
+
+def test_slow_consumer_is_dropped_without_blocking_publisher():
+    async def run():
+        feed = _feed(buffer=2)
+        slow, fast = feed.subscribe(), feed.subscribe()
+        for i in range(3):
+            feed.publish("update", {"id": i})
+            assert (await fast.next(1)).type == "update"
+        with pytest.raises(SlowConsumer):
+            await slow.next(1)
+        return feed
+
+    feed = asyncio.run(run())
+    assert feed.dropped == 1
+    assert len(feed.subscribers) == 1
+
+
+def test_idle_subscription_times_out_for_keepalive():
+    async def run():
+        return await _feed().subscribe().next(0.01)
+
+    assert asyncio.run(run()) is None
+
+
+def test_full_when_max_subscribers_reached():
+    async def run():
+        feed = _feed(max_subscribers=1)
+        subscription = feed.subscribe()
+        full = feed.full
+        feed.unsubscribe(subscription)
+        return full, feed.full
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_bulk_event_lists_created_and_updated_companies():
+    async def run():
+        feed = _feed()
+        subscription = feed.subscribe()
+        feed.publish_bulk([{"id": 1, "symbol": "VCB"}], [{"id": 2, "symbol": "FPT"}])
+        return await subscription.next(1)
+
+    event = asyncio.run(run())
+    assert event.type == "bulk"
+    assert json.loads(event.data) == {
+        "id": event.id,
+        "type": "bulk",
+        "created": [{"id": 1, "symbol": "VCB"}],
+        "updated": [{"id": 2, "symbol": "FPT"}],
+    }
+
+
+class FakeUpsertSession:
+    """Returns (inserted, id, symbol) for every row, as RETURNING would."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        rows = statement.compile().params
+        symbols = sorted(value for key, value in rows.items() if key.startswith("symbol"))
+
+        class Result:
+            def all(self):
+                return [(i % 2 == 0, i, symbol) for i, symbol in enumerate(symbols)]
+
+        return Result()
+
+    async def commit(self):
+        pass
+
+
+def test_import_larger_than_subscriber_buffer_keeps_live_subscribers(monkeypatch):
+    feed = _feed(history=1000, buffer=256)
+    monkeypatch.setattr(crud_company, "company_feed", feed)
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", False)
+    objs = [
+        CompanyCreate(
+            symbol=f"S{i:03d}", organ_code=f"ORG{i}", organ_short_name=f"C{i}", organ_name=f"C {i}"
+        )
+        for i in range(600)
+    ]
+
+    async def run():
+        subscription = feed.subscribe()
+        db = FakeUpsertSession()
+        counts = await crud_company.company.upsert_many(db, objs_in=objs)
+        return counts, db, subscription, await subscription.next(1)
+
+    counts, db, subscription, event = asyncio.run(run())
+    assert counts == (300, 300)
+    assert subscription in feed.subscribers and not subscription.dropped
+    assert feed.published == 1
+    document = json.loads(event.data)
+    assert len(document["created"]) + len(document["updated"]) == 600
+    # Rows equal to the stored ones are skipped by the upsert itself
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "WHERE (companies.organ_code" in sql and "IS DISTINCT FROM (excluded." in sql
@@ -0,0 +1,61 @@
+import asyncio
+
+from app import crud, schemas
+from app.core.config import settings
+
+
+def _seed(session_factory, *symbols):
+    async def run():
+        async with session_factory() as db:
+            ids = []
+            for symbol in symbols:
+                company = await crud.company.create(
+                    db,
+                    obj_in=schemas.CompanyCreate(
+                        symbol=symbol,
+                        organ_code=symbol,
+                        organ_short_name=symbol,
+                        organ_name=f"{symbol} JSC",
+                    ),
+                )
+                ids.append(company.id)
+            return ids
+
+    return asyncio.run(run())
+
+
+def test_batch_follows_request_order_and_drops_duplicate_keys(client, session_factory):
+    _seed(session_factory, "VCB", "FPT")
+    response = client.get("/api/v1/companies/batch", params={"symbols": "FPT,VCB,FPT, VCB"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [company["symbol"] for company in body["items"]] == ["FPT", "VCB"]
+    assert body["missing"] == []
+
+
+def test_batch_reports_missing_keys(client, session_factory):
+    vcb_id, = _seed(session_factory, "VCB")
+    body = client.get("/api/v1/companies/batch", params={"symbols": "VCB,XYZ,XYZ"}).json()
+    assert [company["symbol"] for company in body["items"]] == ["VCB"]
+    assert body["missing"] == ["XYZ"]
+
+    body = client.get("/api/v1/companies/batch", params={"ids": f"{vcb_id},999"}).json()
+    assert [company["id"] for company in body["items"]] == [vcb_id]
+    assert body["missing"] == [999]
+
+
+def test_batch_rejects_too_many_keys(client, monkeypatch):
+    monkeypatch.setattr(settings, "COMPANY_BATCH_MAX_KEYS", 3)
+    # Duplicates don't count towards the limit
+    response = client.get("/api/v1/companies/batch", params={"ids": "1,2,3,3,2,1"})
+    assert response.status_code == 200
+    response = client.get("/api/v1/companies/batch", params={"ids": "1,2,3,4"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "At most 3 keys per request"
+
+
+def test_batch_rejects_bad_keys(client):
+    assert client.get("/api/v1/companies/batch").status_code == 400
+    params = {"symbols": "VCB", "ids": "1"}
+    assert client.get("/api/v1/companies/batch", params=params).status_code == 400
+    assert client.get("/api/v1/companies/batch", params={"ids": "1,VCB"}).status_code == 400
@@ -0,0 +1,112 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import serialization
+from app.core.config import settings
+from app.core.middleware import CompressionMiddleware
+from app.core.negotiation import choose_encoding, negotiate_media_type
+
+LARGE = "x" * 5000
+
+
+def _client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(settings, "COMPRESSION_ENCODINGS", ["gzip"])
+    monkeypatch.setattr(settings, "COMPRESSION_MINIMUM_SIZE", 1024)
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/text")
+    async def text(size: int):
+        return PlainTextResponse("x" * size)
+
+    @app.get("/events")
+    async def events():
+        return StreamingResponse(iter([LARGE.encode()]), media_type="text/event-stream")
+
+    return TestClient(app, headers={"accept-encoding": "gzip"})
+
+
+def test_choose_encoding_by_quality_then_configured_order(monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_ENCODINGS", ["gzip"])
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("gzip;q=0, *") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding(None) is None
+    # Codings whose package is missing are never chosen
+    monkeypatch.setattr(settings, "COMPRESSION_ENCODINGS", ["nope", "gzip"])
+    assert choose_encoding("nope, gzip;q=0.5") == "gzip"
+
+
+def test_large_bodies_are_compressed(monkeypatch):
+    client = _client(monkeypatch)
+    # Read the raw body, which TestClient would otherwise decode
+    with client.stream("GET", "/text", params={"size": 5000}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw) < 5000
+    assert gzip.decompress(raw) == LARGE.encode()
+
+
+def test_small_and_event_stream_bodies_are_sent_as_is(monkeypatch):
+    client = _client(monkeypatch)
+    small = client.get("/text", params={"size": 100})
+    assert "content-encoding" not in small.headers
+    assert small.text == "x" * 100
+    events = client.get("/events")
+    assert "content-encoding" not in events.headers
+    assert events.text == LARGE
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_ENCODINGS", ["gzip"])
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        for i in range(3):
+            body = f"row {i}\n".encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+    start, *bodies = sent
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    # Every chunk is flushed, so the rows sent so far can already be decoded
+    decoder = zlib.decompressobj(31)
+    assert [decoder.decompress(body["body"]) for body in bodies] == [
+        b"row 0\n", b"row 1\n", b"row 2\n", b""
+    ]
+    assert decoder.eof
+
+
+def test_msgpack_is_negotiated_from_accept(monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    assert negotiate_media_type(None) == "application/json"
+    assert negotiate_media_type("*/*") == "application/json"
+    assert negotiate_media_type("application/msgpack") == "application/msgpack"
+    assert negotiate_media_type("application/x-msgpack, */*;q=0.1") == "application/msgpack"
+    assert negotiate_media_type("application/json, application/msgpack;q=0.5") == "application/json"
+    document = {"items": [{"symbol": "VCB"}], "page": 1}
+    assert msgpack.unpackb(serialization.dump_msgpack(document)) == document
+    # Without msgpack installed every client gets JSON
+    monkeypatch.setattr(serialization, "_msgpack", lambda: None)
+    assert negotiate_media_type("application/msgpack") == "application/json"
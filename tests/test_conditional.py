@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from app.core.conditional import is_not_modified, make_etag, validator_headers
+
+MODIFIED = datetime(2026, 10, 18, 10, 0, 0, 250_000)
+
+
+def test_etag_is_weak_and_depends_on_every_part():
+    etag = make_etag(3, ["symbol"], "page=1")
+    assert etag.startswith('W/"')
+    assert etag == make_etag(3, ["symbol"], "page=1")
+    assert etag != make_etag(4, ["symbol"], "page=1")
+    assert etag != make_etag(3, ["symbol"], "page=2")
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag("x")
+    strong = etag[2:]
+    assert is_not_modified({"if-none-match": etag}, etag, None)
+    assert is_not_modified({"if-none-match": f'"other", {strong}'}, etag, None)
+    assert is_not_modified({"if-none-match": "*"}, etag, None)
+    assert not is_not_modified({"if-none-match": '"other"'}, etag, None)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {
+        "if-none-match": '"stale"',
+        "if-modified-since": "Sun, 18 Oct 2026 10:00:00 GMT",
+    }
+    assert not is_not_modified(headers, make_etag("x"), MODIFIED)
+
+
+def test_if_modified_since_compares_whole_seconds():
+    etag = make_etag("x")
+    last_modified = validator_headers(etag, MODIFIED)["Last-Modified"]
+    assert last_modified == "Sun, 18 Oct 2026 10:00:00 GMT"
+    assert is_not_modified({"if-modified-since": last_modified}, etag, MODIFIED)
+    assert is_not_modified(
+        {"if-modified-since": last_modified}, etag, MODIFIED.replace(tzinfo=timezone.utc)
+    )
+    assert not is_not_modified(
+        {"if-modified-since": "Sun, 18 Oct 2026 09:59:59 GMT"}, etag, MODIFIED
+    )
+    assert not is_not_modified({"if-modified-since": "yesterday"}, etag, MODIFIED)
+    assert not is_not_modified({}, etag, MODIFIED)
+
+
+def test_cache_control_is_configurable(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "COMPANY_CACHE_CONTROL", "public, max-age=5")
+    assert validator_headers('W/"x"', None) == {
+        "ETag": 'W/"x"',
+        "Cache-Control": "public, max-age=5",
+    }
+    monkeypatch.setattr(settings, "COMPANY_CACHE_CONTROL", "")
+    assert "Cache-Control" not in validator_headers('W/"x"', None)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+from app import crud
+from app.core.config import settings
+from app.db.invalidation import MAX_KEYS, InvalidationBus
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def _payload(statement) -> dict:
+    params = statement.compile().params
+    return json.loads(next(value for value in params.values() if value.startswith("{")))
+
+
+def test_notify_sends_keys_in_the_transaction(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", True)
+    bus = InvalidationBus()
+    db = FakeSession()
+    asyncio.run(bus.notify(db, "company", [1, 2]))
+    asyncio.run(bus.notify(db, "company", range(MAX_KEYS + 1)))
+    assert [_payload(statement)["keys"] for statement in db.statements] == [["1", "2"], None]
+    assert _payload(db.statements[0])["origin"] == bus.origin
+
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", False)
+    asyncio.run(bus.notify(db, "company", [3]))
+    assert len(db.statements) == 2
+
+
+def test_messages_from_other_workers_evict_registered_caches():
+    bus = InvalidationBus()
+    evicted = []
+    bus.register("user", evicted.append)
+    bus.handle(json.dumps({"origin": "other", "kind": "user", "keys": ["a"]}))
+    bus.handle(json.dumps({"origin": "other", "kind": "company", "keys": ["b"]}))
+    bus.handle(json.dumps({"origin": bus.origin, "kind": "user", "keys": ["c"]}))
+    bus.handle("not json")
+    assert evicted == [["a"]]
+    assert bus.received == 2
+    bus.flush()
+    assert evicted == [["a"], None]
+
+
+def test_crud_caches_are_evicted_by_key_or_flushed():
+    user_id = uuid.uuid4()
+    other_id = uuid.uuid4()
+    cache = crud.user.principal_cache
+    cache.set(user_id, object())
+    cache.set(other_id, object())
+    crud.user._evict([str(user_id)])
+    assert cache.get(user_id) is None
+    assert cache.get(other_id) is not None
+    crud.company.count_cache.set((None, ""), 10)
+    crud.user._evict(None)
+    crud.company.invalidate(["1"])
+    assert len(cache) == 0
+    assert len(crud.company.count_cache) == 0
+
+
+class CountingSession:
+    def __init__(self, bind, total):
+        self.bind = bind
+        self.total = total
+
+    async def execute(self, statement):
+        return SimpleNamespace(scalar=lambda: self.total)
+
+
+def test_replica_totals_are_not_served_to_primary_readers():
+    crud.company.count_cache.clear()
+    # Counted on a lagging replica just after a write was invalidated
+    replica = CountingSession("replica", 5)
+    assert asyncio.run(crud.company.count(replica)) == 5
+    primary = CountingSession("primary", 6)
+    assert asyncio.run(crud.company.count(primary)) == 6
+    replica.total = primary.total = 7
+    # Both totals are cached, each for its own database
+    assert asyncio.run(crud.company.count(replica)) == 5
+    assert asyncio.run(crud.company.count(primary)) == 6
+    crud.company.count_cache.clear()
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -7,4 +10,16 @@ client = TestClient(app)
 
 def test_read_main():
     response = client.get("/")
-    assert response.status_code == 404 
\ No newline at end of file
+    assert response.status_code == 404 
+
+def test_import_does_not_load_optional_dependencies():
+    # A fresh interpreter, since this one has already imported everything
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('discord', 'aiohttp', 'asyncpg', 'multiprocessing') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,129 @@
+import asyncio
+
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import crud
+from app.core.config import settings
+from app.core.metrics import Exposition, RequestMetrics
+from app.core.middleware import UNMATCHED_ROUTE, MetricsMiddleware
+from app.models.user import Role
+
+
+def _client(metrics: RequestMetrics) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=503)
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+def test_requests_are_labelled_by_route_template():
+    metrics = RequestMetrics()
+    client = _client(metrics)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/0")
+    client.get("/nowhere")
+
+    stats = metrics.routes[("GET", "/items/{item_id}")]
+    assert stats.responses == {200: 2, 503: 1}
+    assert stats.errors == 1
+    assert stats.latency.count == 3
+    assert metrics.routes[("GET", UNMATCHED_ROUTE)].responses == {404: 1}
+    assert metrics.in_flight == 0
+
+
+def test_prometheus_exposition():
+    metrics = RequestMetrics()
+    _client(metrics).get("/items/1")
+
+    exposition = Exposition()
+    exposition.add_request_metrics(metrics)
+    text = exposition.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 1' in text
+
+
+def test_event_streams_are_kept_out_of_request_latency():
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    open_during_stream = []
+
+    @app.get("/changes")
+    async def stream_changes():
+        async def body():
+            open_during_stream.append((metrics.in_flight, metrics.streams_open))
+            yield b"data: {}\n\n"
+
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    @app.websocket("/changes/ws")
+    async def changes_websocket(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_json({})
+        await websocket.close()
+
+    client = TestClient(app)
+    client.get("/changes")
+    with client.websocket_connect("/changes/ws") as websocket:
+        websocket.receive_json()
+
+    assert open_during_stream == [(0, 1)]
+    stats = metrics.routes[("GET", "/changes")]
+    assert stats.responses == {200: 1}
+    assert stats.latency.count == 0
+    assert list(metrics.routes) == [("GET", "/changes")]
+    assert (metrics.in_flight, metrics.streams_open) == (0, 0)
+
+    exposition = Exposition()
+    exposition.add_request_metrics(metrics)
+    text = exposition.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/changes"} 0' in text
+    assert "http_streams_open 0" in text
+
+
+def _access_token(client, session_factory, role=Role.USER) -> str:
+    credentials = {"username": "ops@example.com", "password": "secret123"}
+    client.post(
+        "/api/v1/auth/register",
+        json={"email": credentials["username"], "full_name": "Ops", "password": credentials["password"]},
+    )
+
+    async def grant():
+        async with session_factory() as db:
+            user = await crud.user.get_by_email(db, email=credentials["username"])
+            await crud.user.update(db, db_obj=user, obj_in={"role": role})
+
+    asyncio.run(grant())
+    return client.post("/api/v1/auth/login", data=credentials).json()["access_token"]
+
+
+def test_metrics_need_the_scrape_token_or_an_admin(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    for path in ("/metrics", "/api/v1/metrics/caches"):
+        assert client.get(path).status_code == 401
+        headers = {"Authorization": "Bearer wrong-secret"}
+        assert client.get(path, headers=headers).status_code == 403
+        headers = {"Authorization": "Bearer scrape-secret"}
+        assert client.get(path, headers=headers).status_code == 200
+
+    headers = {"Authorization": f"Bearer {_access_token(client, session_factory)}"}
+    assert client.get("/api/v1/metrics/caches", headers=headers).status_code == 403
+    headers = {"Authorization": f"Bearer {_access_token(client, session_factory, Role.ADMIN)}"}
+    assert client.get("/api/v1/metrics/caches", headers=headers).status_code == 200
+
+
+def test_metrics_without_a_scrape_token_are_for_admins_only(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    # An empty token configured means none is accepted, not that anything is
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 403
@@ -0,0 +1,112 @@
+import asyncio
+
+from app.core.notifications import (
+    FakeDiscordTransport,
+    NotificationDispatcher,
+    RateLimited,
+    build_embeds,
+)
+
+
+def _dispatcher(transport, **kwargs) -> NotificationDispatcher:
+    return NotificationDispatcher(transport, channel_id=42, interval=0.05, **kwargs)
+
+
+def test_burst_is_sent_as_one_call_and_flushed_on_stop():
+    async def run():
+        transport = FakeDiscordTransport()
+        dispatcher = _dispatcher(transport)
+        await dispatcher.start()
+        for i in range(25):
+            assert dispatcher.notify(f"user {i}", title="Signups")
+        await dispatcher.stop()
+        return transport, dispatcher
+
+    transport, dispatcher = asyncio.run(run())
+    assert transport.calls == 1
+    [(channel_id, embeds)] = transport.sent
+    assert channel_id == 42
+    assert embeds[0]["title"] == "Signups (25)"
+    assert dispatcher.stats()["sent"] == 25
+
+
+def test_rate_limited_calls_are_retried():
+    class FlakyTransport(FakeDiscordTransport):
+        async def send(self, channel_id, embeds):
+            if self.calls == 0:
+                self.calls += 1
+                raise RateLimited(0.01)
+            await super().send(channel_id, embeds)
+
+    async def run():
+        transport = FlakyTransport()
+        dispatcher = _dispatcher(transport)
+        await dispatcher.start()
+        dispatcher.notify("hello")
+        await dispatcher.stop()
+        return transport, dispatcher
+
+    transport, dispatcher = asyncio.run(run())
+    assert len(transport.sent) == 1
+    assert dispatcher.rate_limited == 1
+    assert dispatcher.sent == 1
+
+
+def test_full_queue_drops_messages():
+    async def run():
+        dispatcher = _dispatcher(FakeDiscordTransport(), max_queue=2)
+        await dispatcher.start()
+        results = [dispatcher.notify(str(i)) for i in range(3)]
+        await dispatcher.stop()
+        return results, dispatcher
+
+    results, dispatcher = asyncio.run(run())
+    assert results == [True, True, False]
+    assert dispatcher.dropped == 1
+
+
+def test_long_batches_are_split_across_embeds():
+    embeds = build_embeds("Signups", ["x" * 3000] * 3)
+    assert len(embeds) == 3
+    assert all(len(embed["description"]) <= 4096 for embed in embeds)
+
+
+def test_large_burst_stays_within_discord_message_size():
+    async def run():
+        transport = FakeDiscordTransport()
+        dispatcher = _dispatcher(transport)
+        await dispatcher.start()
+        for i in range(200):
+            dispatcher.notify(f"user {i} " + "x" * 500, title="Signups")
+        await dispatcher.stop()
+        return transport, dispatcher
+
+    transport, dispatcher = asyncio.run(run())
+    assert dispatcher.failed == 0
+    assert dispatcher.sent == 200
+    assert transport.calls > 1
+    for _, embeds in transport.sent:
+        assert sum(len(e["title"]) + len(e["description"]) for e in embeds) <= 6000
+
+
+def test_partly_delivered_batch_counts_sent_and_failed_messages():
+    class FailingSecondCall(FakeDiscordTransport):
+        async def send(self, channel_id, embeds):
+            if self.calls == 1:
+                self.calls += 1
+                raise RuntimeError("500 Internal Server Error")
+            await super().send(channel_id, embeds)
+
+    async def run():
+        transport = FailingSecondCall()
+        dispatcher = _dispatcher(transport)
+        await dispatcher.start()
+        # 3000 characters per message: one embed, and so one Discord message, each
+        for i in range(3):
+            dispatcher.notify(f"{i}" * 3000, title="Signups")
+        await dispatcher.stop()
+        return transport, dispatcher
+
+    transport, dispatcher = asyncio.run(run())
+    assert len(transport.sent) == 2
+    assert (dispatcher.sent, dispatcher.failed) == (2, 1)
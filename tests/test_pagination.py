@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("symbol", "VCB", 42)
+    assert decode_cursor(token, order_by="symbol") == ("VCB", 42)
+
+
+def test_empty_cursor_starts_traversal():
+    assert decode_cursor("", order_by="id") is None
+
+
+def test_cursor_rejects_other_sort_order():
+    token = encode_cursor("id", 42, 42)
+    with pytest.raises(ValueError):
+        decode_cursor(token, order_by="symbol")
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", order_by="id")
+
+
+
+def test_cursor_rejects_sort_key_of_wrong_type():
+    forged = [("symbol", {"$gt": ""}), ("symbol", ["VCB"]), ("symbol", 42), ("id", "42"), ("id", True)]
+    for order_by, key in forged:
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(order_by, key, 42), order_by=order_by)
@@ -0,0 +1,29 @@
+from app.core import security
+
+
+def _options(rounds: int):
+    options = {"schemes": ["bcrypt", "pbkdf2_sha256"], "deprecated": "auto"}
+    security.set_cost(options, "bcrypt", rounds)
+    security.set_cost(options, "pbkdf2_sha256", 1000)
+    return options
+
+
+def test_outdated_hashes_need_update(monkeypatch):
+    monkeypatch.setattr(security, "pwd_context", security.pwd_context)
+    security.configure_password_context(_options(4))
+    weak = security.get_password_hash("secret")
+    security.configure_password_context({**_options(5), "schemes": ["pbkdf2_sha256", "bcrypt"]})
+    legacy_scheme = security.get_password_hash("secret")
+
+    security.configure_password_context(_options(5))
+    assert security.password_needs_update(weak)
+    assert security.password_needs_update(legacy_scheme)
+    assert security.verify_password("secret", legacy_scheme)
+    assert not security.password_needs_update(security.get_password_hash("secret"))
+
+
+def test_calibration_never_lowers_configured_cost():
+    assert security.calibrate(_options(5), target_ms=0.001)["bcrypt__rounds"] == 5
+    calibrated = security.calibrate(_options(4), target_ms=1000)
+    assert 4 < calibrated["bcrypt__rounds"] <= security.MAX_BCRYPT_ROUNDS
+    assert calibrated["bcrypt__min_rounds"] == calibrated["bcrypt__rounds"]
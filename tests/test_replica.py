@@ -0,0 +1,175 @@
+import asyncio
+import inspect
+import time
+import uuid
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.datastructures import Headers
+
+from app.api.v1 import deps
+from app.core import security
+from app.core.config import settings
+from app.core.middleware import ReadYourWritesMiddleware
+from app.db import replica
+from app.db.replica import WRITER_STATE_KEY, ReplicaRouter
+from app.db.session import ReplicaSessionLocal, SessionLocal, get_db
+
+
+def _enable_replica(monkeypatch, **overrides):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", "postgresql+asyncpg://replica/db")
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def test_reads_use_primary_without_replica(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", None)
+    router = ReplicaRouter()
+    router.lag_seconds = 0.0
+    assert not router.use_replica(None)
+    assert router.replica_reads == 0
+
+
+def test_reads_follow_replica_lag(monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_MAX_LAG_SECONDS=5.0, DB_REPLICA_LAG_CHECK_SECONDS=2.0)
+    router = ReplicaRouter()
+    # Not checked yet
+    assert not router.use_replica(None)
+    router.lag_seconds = 1.0
+    assert router.use_replica(None)
+    router.lag_seconds = 30.0
+    assert not router.use_replica(None)
+    assert (router.replica_reads, router.lagging_reads) == (1, 2)
+
+
+def test_recent_writer_stays_on_primary(monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_LAG_CHECK_SECONDS=0)
+    router = ReplicaRouter()
+    assert not router.use_replica(str(time.time() + 5))
+    assert router.use_replica(str(time.time() - 5))
+    assert router.use_replica("not-a-number")
+    assert (router.sticky_reads, router.replica_reads) == (1, 2)
+
+
+def test_failed_lag_check_falls_back_to_primary(monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_LAG_CHECK_SECONDS=2.0)
+    router = ReplicaRouter()
+    router.lag_seconds = 0.0
+
+    async def run():
+        # SQLite has no replication functions, so the check fails
+        engine = create_async_engine("sqlite+aiosqlite://")
+        await router.check_lag(engine)
+        await engine.dispose()
+
+    asyncio.run(run())
+    assert router.lag_seconds is None
+    assert not router.use_replica(None)
+
+
+def test_successful_writes_set_sticky_cookie(monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_STICKY_SECONDS=5.0)
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, router=ReplicaRouter())
+
+    @app.post("/items", dependencies=[Depends(deps.reads_own_writes)])
+    async def create_item(fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=400)
+        return {}
+
+    @app.get("/items")
+    async def read_items():
+        return []
+
+    @app.post("/sessions")
+    async def create_session():
+        return {}
+
+    client = TestClient(app)
+    # Writes of data that is not read from the replica don't pin the client
+    assert "set-cookie" not in client.post("/sessions").headers
+    response = client.post("/items")
+    until = float(response.cookies[settings.DB_REPLICA_STICKY_COOKIE])
+    assert time.time() < until <= time.time() + 5
+    assert "set-cookie" not in client.post("/items", params={"fail": True}).headers
+    assert "set-cookie" not in client.get("/items").headers
+
+
+def test_writes_by_bearer_clients_keep_their_user_on_primary(monkeypatch):
+    _enable_replica(
+        monkeypatch,
+        DB_REPLICA_STICKY_SECONDS=5.0,
+        DB_REPLICA_LAG_CHECK_SECONDS=0,
+        CACHE_INVALIDATION_ENABLED=False,
+    )
+    router = ReplicaRouter()
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, router=router)
+
+    @app.post("/items", dependencies=[Depends(deps.reads_own_writes)])
+    async def create_item(request: Request, user: str):
+        # Set by get_current_user in the real app
+        setattr(request.state, WRITER_STATE_KEY, user)
+        return {}
+
+    client = TestClient(app)
+    client.post("/items", params={"user": "writer"})
+    assert not router.use_replica(None, "writer")
+    assert router.use_replica(None, "someone-else")
+    # Other workers are told through the invalidation bus; flushes carry no user
+    router.remember_writers(["remote-writer"])
+    router.remember_writers(None)
+    assert not router.use_replica(None, "remote-writer")
+    assert router.stats()["recent_writers"] == 2
+
+
+def test_read_session_follows_the_bearer_token_subject(monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_LAG_CHECK_SECONDS=0, DB_REPLICA_STICKY_SECONDS=5.0)
+    router = ReplicaRouter()
+    monkeypatch.setattr(replica, "replica_router", router)
+    monkeypatch.setattr(deps, "replica_router", router)
+    monkeypatch.setattr(replica, "get_replica_engine", lambda: None)
+    user_id = uuid.uuid4()
+    token = security.create_access_token(user_id)
+
+    def factory():
+        scope = {
+            "type": "http",
+            "headers": Headers({"authorization": f"Bearer {token}"}).raw,
+        }
+        return asyncio.run(deps.get_read_session_factory(Request(scope)))
+
+    assert factory() is ReplicaSessionLocal
+    router.remember_writers([str(user_id)])
+    assert factory() is SessionLocal
+
+
+def test_current_user_is_checked_on_the_primary():
+    # A lagging replica would still accept a token revoked moments ago
+    dependency = inspect.signature(deps.get_current_user).parameters["db"].default
+    assert dependency.dependency is get_db
+
+
+def test_only_company_writes_keep_reads_on_the_primary(client, monkeypatch):
+    _enable_replica(monkeypatch, DB_REPLICA_STICKY_SECONDS=5.0)
+    credentials = {"username": "reader@example.com", "password": "secret123"}
+    client.post(
+        "/api/v1/auth/register",
+        json={"email": credentials["username"], "full_name": "Reader", "password": credentials["password"]},
+    )
+    response = client.post("/api/v1/auth/login", data=credentials)
+    assert response.status_code == 200
+    assert "set-cookie" not in response.headers
+    response = client.post(
+        "/api/v1/auth/refresh-token", json={"refresh_token": response.json()["refresh_token"]}
+    )
+    assert response.status_code == 200
+    assert "set-cookie" not in response.headers
+
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    company = {"symbol": "VCB", "organ_code": "VCB", "organ_short_name": "VCB", "organ_name": "VCB JSC"}
+    response = client.post("/api/v1/companies/", headers=headers, json=company)
+    assert response.status_code == 200
+    assert settings.DB_REPLICA_STICKY_COOKIE in response.cookies
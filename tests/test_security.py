@@ -0,0 +1,18 @@
+from jose import jwt
+
+from app.core import security
+from app.core.config import settings
+from app.schemas.token import TokenPayload
+
+
+def _decode(token: str) -> TokenPayload:
+    return TokenPayload(**jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]))
+
+
+def test_tokens_carry_type_version_and_unique_id():
+    access = _decode(security.create_access_token("3f1e4c2a-0000-0000-0000-000000000001", version=2))
+    refresh = _decode(security.create_refresh_token("3f1e4c2a-0000-0000-0000-000000000001", version=2))
+    assert (access.type, refresh.type) == ("access", "refresh")
+    assert access.ver == refresh.ver == 2
+    assert access.jti and refresh.jti and access.jti != refresh.jti
+    assert access.iat is not None
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import schemas
+from app.api.v1.deps import COMPANY_FIELDS, get_company_list_fields
+from app.core.serialization import render_company, render_company_page
+from app.models.company import Company
+
+
+def _companies():
+    return [
+        Company(
+            id=1,
+            symbol="VCB",
+            organ_code="VCB",
+            organ_short_name="Vietcombank",
+            organ_name="Ngân hàng TMCP Ngoại thương Việt Nam",
+            business_descriptions='Tab\there, "quotes" and \\ backslash\n😀',
+            create_date=datetime(2025, 7, 7, 1, 36, 27),
+            update_date=datetime(2025, 7, 7, 1, 36, 27, 111222),
+        ),
+        Company(id=2, symbol="FPT", organ_code="FPT", organ_short_name="FPT", organ_name="FPT"),
+    ]
+
+
+def test_fast_page_matches_response_model_output():
+    params = schemas.PaginationParams(skip=0, limit=2, page=1)
+    companies = _companies()
+
+    field = create_model_field(
+        name="response", type_=schemas.PaginatedResponse[schemas.Company], mode="serialization"
+    )
+    content = asyncio.run(
+        serialize_response(
+            field=field,
+            response_content=schemas.PaginatedResponse.create(
+                items=companies, total=7, params=params
+            ),
+        )
+    )
+    expected = JSONResponse(content).body
+
+    rows = [{name: getattr(company, name) for name in COMPANY_FIELDS} for company in companies]
+    assert render_company_page(rows, 7, params) == expected
+
+
+def test_sparse_rows_render_only_selected_fields():
+    company = _companies()[0]
+    row = {name: getattr(company, name) for name in ("symbol", "organ_short_name")}
+    assert render_company(row) == b'{"symbol":"VCB","organ_short_name":"Vietcombank"}'
+
+
+def test_list_fields_defer_business_descriptions_by_default():
+    assert "business_descriptions" not in get_company_list_fields(None)
+    assert get_company_list_fields(["symbol", "business_descriptions"]) == [
+        "symbol",
+        "business_descriptions",
+    ]
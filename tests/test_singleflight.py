@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import crud
+from app.core.config import settings
+from app.core.singleflight import SingleFlight, SingleFlightTimeout
+
+
+class Backend:
+    """Counts calls and blocks each one until `release` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def fetch(self, value="row"):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return value
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def run():
+        flight = SingleFlight(timeout=5)
+        backend = Backend()
+        waiters = [asyncio.create_task(flight.do("VCB", backend.fetch)) for _ in range(5)]
+        other = asyncio.create_task(flight.do("FPT", lambda: backend.fetch("other")))
+        await asyncio.sleep(0)
+        backend.release.set()
+        assert await asyncio.gather(*waiters) == ["row"] * 5
+        assert await other == "other"
+        assert backend.calls == 2
+        assert flight.stats() == {
+            "in_flight": 0, "executed": 2, "coalesced": 4, "timeouts": 0, "abandoned": 0
+        }
+        # Finished flights are not reused
+        assert await flight.do("VCB", backend.fetch) == "row"
+        assert backend.calls == 3
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_waiter():
+    async def run():
+        flight = SingleFlight(timeout=5)
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+        )
+        assert [type(result) for result in results] == [ValueError] * 3
+        assert flight.executed == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        flight = SingleFlight(timeout=5)
+        backend = Backend()
+        leader = asyncio.create_task(flight.do("key", backend.fetch))
+        follower = asyncio.create_task(flight.do("key", backend.fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        backend.release.set()
+        assert await follower == "row"
+        assert leader.cancelled()
+        assert backend.cancelled == 0
+
+    asyncio.run(run())
+
+
+def test_shared_call_is_cancelled_when_nobody_waits():
+    async def run():
+        flight = SingleFlight(timeout=5)
+        backend = Backend()
+        waiters = [asyncio.create_task(flight.do("key", backend.fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert backend.cancelled == 1
+        assert flight.stats()["abandoned"] == 1
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_timed_out_flight_is_replaced_by_a_fresh_one():
+    async def run():
+        flight = SingleFlight(timeout=0.05)
+        backend = Backend()
+        waiters = [flight.do("key", backend.fetch) for _ in range(3)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert [type(result) for result in results] == [SingleFlightTimeout] * 3
+        # One slow shared call, however many callers gave up on it
+        assert flight.timeouts == 1
+        await asyncio.sleep(0)
+        assert backend.cancelled == 1
+        backend.release.set()
+        assert await flight.do("key", backend.fetch) == "row"
+        assert backend.calls == 2
+
+    asyncio.run(run())
+
+
+def test_reads_after_a_company_write_do_not_join_older_reads(monkeypatch):
+    monkeypatch.setattr(settings, "COMPANY_READ_COALESCING", True)
+    monkeypatch.setattr(crud.company, "read_flight", SingleFlight(timeout=5))
+    db = SimpleNamespace(bind=create_async_engine("sqlite+aiosqlite://"))
+    stored = {"name": "old"}
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def read(session):
+        snapshot = stored["name"]
+        started.set()
+        await release.wait()
+        return snapshot
+
+    async def run():
+        leader = asyncio.create_task(crud.company._coalesced(db, ("id", 1), read))
+        await started.wait()
+        # A write commits while the leader's query is running
+        stored["name"] = "new"
+        crud.company.invalidate()
+        late = asyncio.create_task(crud.company._coalesced(db, ("id", 1), read))
+        await asyncio.sleep(0)
+        release.set()
+        return await leader, await late
+
+    assert asyncio.run(run()) == ("old", "new")
+    assert crud.company.read_flight.executed == 2
@@ -0,0 +1,29 @@
+import asyncio
+
+from app.core.streaming import iter_csv_records, iter_ndjson_records
+
+
+async def _chunks(data: bytes, size: int = 5):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(records):
+    return [record async for record in records]
+
+
+def test_ndjson_records_survive_chunk_boundaries():
+    data = '{"symbol": "VCB", "organ_name": "Ngân hàng"}\n\nnot json\n'.encode("utf-8")
+    records = asyncio.run(_collect(iter_ndjson_records(_chunks(data))))
+    assert records[0] == (1, {"symbol": "VCB", "organ_name": "Ngân hàng"}, None)
+    assert records[1][0] == 3
+    assert records[1][2].startswith("Invalid JSON")
+
+
+def test_csv_records_allow_multiline_quoted_fields():
+    data = b'symbol,business_descriptions\nFPT,"line one\nline two"\nVNM,\n'
+    records = asyncio.run(_collect(iter_csv_records(_chunks(data))))
+    assert records == [
+        (2, {"symbol": "FPT", "business_descriptions": "line one\nline two"}, None),
+        (4, {"symbol": "VNM", "business_descriptions": None}, None),
+    ]
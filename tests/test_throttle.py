@@ -0,0 +1,71 @@
+import asyncio
+
+from app.core.throttle import LoginThrottle, MemoryThrottleStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _hit(store: MemoryThrottleStore, key: str = "account:a") -> float:
+    return asyncio.run(store.hit(key, limit=3, window=60, lockout=10, max_lockout=25))
+
+
+def test_lockout_after_limit_and_exponential_backoff():
+    clock = FakeClock()
+    store = MemoryThrottleStore(maxsize=10, ttl=3600, timer=clock)
+    assert [_hit(store) for _ in range(4)] == [0, 0, 0, 10]
+    assert asyncio.run(store.retry_after("account:a")) == 10
+
+    clock.now = 10
+    assert asyncio.run(store.retry_after("account:a")) == 0
+    assert [_hit(store) for _ in range(4)] == [0, 0, 0, 20]
+
+    clock.now = 30
+    # Capped at max_lockout
+    assert [_hit(store) for _ in range(4)] == [0, 0, 0, 25]
+
+
+def test_sliding_window_weights_previous_window():
+    clock = FakeClock()
+    store = MemoryThrottleStore(maxsize=10, ttl=3600, timer=clock)
+    _hit(store)
+    _hit(store)
+    _hit(store)
+    # Halfway into the next window half of the old failures still count
+    clock.now = 90
+    assert _hit(store) == 0
+    assert _hit(store) == 10
+
+
+def test_memory_is_bounded():
+    store = MemoryThrottleStore(maxsize=2, ttl=3600)
+    for key in ("a", "b", "c"):
+        _hit(store, key)
+    assert len(store.counters) == 2
+
+
+def test_success_resets_account_but_not_address(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ACCOUNT_LIMIT", 1)
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_IP_LIMIT", 1)
+    throttle = LoginThrottle(MemoryThrottleStore(maxsize=10, ttl=3600))
+
+    async def run():
+        await throttle.failure("1.2.3.4", "A@example.com")
+        await throttle.failure("1.2.3.4", "a@example.com")
+        locked = await throttle.check("5.6.7.8", "a@example.com")
+        await throttle.success("5.6.7.8", "a@example.com")
+        return locked, await throttle.check("5.6.7.8", "a@example.com"), await throttle.check(
+            "1.2.3.4", "b@example.com"
+        )
+
+    locked, after_success, same_ip = asyncio.run(run())
+    assert locked > 0
+    assert after_success == 0
+    assert same_ip > 0
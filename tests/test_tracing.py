@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.middleware import QueryTracingMiddleware
+from app.db import tracing
+
+
+def test_queries_are_counted_per_request_and_checked_against_budget(monkeypatch):
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 2)
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGETS", {"GET /few": 0})
+    engine = create_engine("sqlite://")
+    tracing.install(engine)
+    tracer = tracing.QueryTracer()
+
+    app = FastAPI()
+    app.add_middleware(QueryTracingMiddleware, tracer=tracer)
+
+    def run_queries(count: int) -> None:
+        with engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("SELECT 1"))
+
+    @app.get("/many")
+    def many():
+        run_queries(3)
+
+    @app.get("/few")
+    def few():
+        run_queries(3)
+
+    client = TestClient(app)
+    response = client.get("/many")
+    assert 'db-queries;desc="3"' in response.headers["server-timing"]
+    assert tracer.budget_exceeded == {("GET", "/many"): 1}
+
+    # A budget of 0 for the route disables the check
+    client.get("/few")
+    assert tracer.budget_exceeded == {("GET", "/many"): 1}
+
+    # Outside of a request nothing is recorded
+    run_queries(1)
+    assert tracing.current_query_stats.get() is None
+
+
+class FakeCursor:
+    def __init__(self, executed, fail):
+        self.executed = executed
+        self.fail = fail
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement)
+        if statement.startswith("EXPLAIN") and self.fail:
+            raise RuntimeError("division by zero")
+
+    def fetchall(self):
+        return [("Seq Scan on companies",)]
+
+    def close(self):
+        pass
+
+
+def _postgres_connection(executed, fail=False):
+    dbapi_connection = SimpleNamespace(cursor=lambda: FakeCursor(executed, fail))
+    return SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"), connection=dbapi_connection
+    )
+
+
+def _slow_query(conn, statement, **options):
+    context = SimpleNamespace(_query_started=0.0, execution_options=options)
+    tracing._after_cursor_execute(conn, None, statement, (), context, False)
+
+
+def test_only_opted_in_reads_are_explained_in_a_savepoint(monkeypatch):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_EXPLAIN", True)
+    executed = []
+    conn = _postgres_connection(executed)
+
+    # Running it again would send the notification twice
+    _slow_query(conn, "SELECT pg_notify('channel', 'payload')")
+    assert executed == []
+
+    _slow_query(conn, "SELECT id FROM companies", explain_slow=True)
+    assert executed == [
+        "SAVEPOINT explain_slow_query",
+        "EXPLAIN ANALYZE SELECT id FROM companies",
+        "ROLLBACK TO SAVEPOINT explain_slow_query",
+        "RELEASE SAVEPOINT explain_slow_query",
+    ]
+
+
+def test_failed_explain_rolls_back_to_the_savepoint(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_EXPLAIN", True)
+    executed = []
+    _slow_query(_postgres_connection(executed, fail=True), "SELECT 1", explain_slow=True)
+    # Otherwise the caller's transaction would be left aborted
+    assert executed[-2:] == [
+        "ROLLBACK TO SAVEPOINT explain_slow_query",
+        "RELEASE SAVEPOINT explain_slow_query",
+    ]
+    assert "EXPLAIN ANALYZE failed: division by zero" in caplog.text